@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bookProject.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+
+from book.importer import BookImporter  # noqa: E402
+from book.models import Book, book_fingerprint  # noqa: E402
+
+SEED_BATCH_SIZE = 10000
+
+
+@contextmanager
+def benchmark_database():
+    # 本番のDBを汚さないよう、テスト用のDBを作成して計測する
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_books(count, author_count=5000, category_count=50):
+    # 計測用の本を count 件になるまで追加する
+    start = Book.objects.count()
+    importer = BookImporter(batch_size=SEED_BATCH_SIZE)
+    for offset in range(start, count, SEED_BATCH_SIZE):
+        books = []
+        for i in range(offset, min(offset + SEED_BATCH_SIZE, count)):
+            authors = [f"Author{i % author_count}", f"Author{(i * 7) % author_count}"]
+            books.append(
+                {
+                    "title": f"Title{i}",
+                    "published_date": f"{1950 + i % 70}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                    "authors": authors,
+                    "categories": [f"Category{i % category_count}"],
+                    "fingerprint": book_fingerprint(f"Title{i}", authors),
+                }
+            )
+        with transaction.atomic():
+            importer.write(books)
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def parse_sizes(argv, default):
+    return [int(size) for size in argv] or default
@@ -0,0 +1,50 @@
+"""CSV export: prefetch_related + Python join vs. one aggregated query.
+
+python benchmarks/export_benchmark.py [sizes...]   (default: 100000 1000000)
+"""
+
+import csv
+import sys
+
+from common import benchmark_database, parse_sizes, seed_books, timed
+
+from book.exporter import iter_aggregated_rows, stream_csv
+from book.models import Book
+
+
+class Null:
+    def write(self, value):
+        return len(value)
+
+
+def prefetch_export():
+    # 集計を導入する前の book_shelf_view の実装
+    writer = csv.writer(Null())
+    writer.writerow(["No.", "Title", "Published Date", "Author", "Category"])
+    for index, book in enumerate(
+        Book.objects.all().prefetch_related("authors", "categories"), 1
+    ):
+        authors = ", ".join([author.name for author in book.authors.all()])
+        categories = ", ".join([category.name for category in book.categories.all()])
+        writer.writerow([index, book.title, book.published_date, authors, categories])
+
+
+def aggregated_export():
+    for _ in stream_csv(iter_aggregated_rows()):
+        pass
+
+
+def main(sizes):
+    with benchmark_database():
+        print(
+            f"{'books':>10} {'prefetch (s)':>14} {'aggregated (s)':>15} {'speedup':>8}"
+        )
+        for size in sizes:
+            seed_books(size)
+            before, _ = timed(prefetch_export)
+            after, _ = timed(aggregated_export)
+            print(f"{size:>10} {before:>14.2f} {after:>15.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(parse_sizes(sys.argv[1:], [100000, 1000000]))
@@ -0,0 +1,46 @@
+"""Book list payloads: JSON vs. MessagePack size and encode/decode time.
+
+python benchmarks/format_benchmark.py [sizes...]   (default: 1000 10000)
+"""
+
+import json
+import sys
+
+from common import benchmark_database, parse_sizes, seed_books, timed
+
+from book.models import Book
+from book.renderers import MessagePackRenderer, msgpack
+from book.serializers import BOOK_FIELDS, serialize_book_rows
+from rest_framework.renderers import JSONRenderer
+
+
+def main(sizes, repeat=5):
+    if msgpack is None:
+        sys.exit("msgpack is not installed (pip install msgpack)")
+    formats = [
+        ("json", JSONRenderer(), json.loads),
+        ("msgpack", MessagePackRenderer(), msgpack.unpackb),
+    ]
+    with benchmark_database():
+        print(
+            f"{'books':>10} {'format':>8} {'bytes':>12}"
+            f" {'encode (s)':>11} {'decode (s)':>11}"
+        )
+        for size in sizes:
+            seed_books(size)
+            data = serialize_book_rows(
+                list(Book.objects.order_by("id")[:size].values(*BOOK_FIELDS))
+            )
+            for name, renderer, decode in formats:
+                encode_time, content = min(
+                    timed(renderer.render, data) for _ in range(repeat)
+                )
+                decode_time = min(timed(decode, content)[0] for _ in range(repeat))
+                print(
+                    f"{size:>10} {name:>8} {len(content):>12}"
+                    f" {encode_time:>11.4f} {decode_time:>11.4f}"
+                )
+
+
+if __name__ == "__main__":
+    main(parse_sizes(sys.argv[1:], [1000, 10000]))
@@ -0,0 +1,137 @@
+"""CSV import: the original per-row book_register_view import vs. the bulk_create
+importer vs. COPY + staging table (PostgreSQL only).
+
+python benchmarks/import_benchmark.py [sizes...]   (default: 1000 10000)
+"""
+
+import datetime
+import sys
+from contextlib import contextmanager
+
+from common import benchmark_database, parse_sizes, timed
+
+from django.db import connection
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from book import signals
+from book.importer import BookImporter, CopyBookImporter
+from book.models import Author, Book, Category
+
+BATCH_SIZE = 10000
+
+
+def generate_lines(prefix, count, author_count=5000, category_count=50):
+    # import_books と同じCSVの列（タイトル、出版日、著者、カテゴリー）
+    for i in range(count):
+        yield [
+            f"{prefix}Title{i}",
+            f"{1950 + i % 70}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            f"{prefix}Author{i % author_count},{prefix}Author{(i * 7) % author_count}",
+            f"{prefix}Category{i % category_count}",
+        ]
+
+
+@contextmanager
+def without_signal_receivers():
+    # 元の実装の頃にはハッシュの更新やバージョンのシグナルが無かったので外しておく
+    receivers = [
+        (m2m_changed, signals.book_authors_changed, Book.authors.through),
+        (m2m_changed, signals.remember_cleared_books, Book.authors.through),
+        (m2m_changed, signals.bump_relation_version, Book.authors.through),
+        (m2m_changed, signals.bump_relation_version, Book.categories.through),
+        (post_save, signals.author_saved, Author),
+        (post_save, signals.bump_model_version, None),
+        (post_delete, signals.bump_model_version, None),
+    ]
+    for signal, receiver, sender in receivers:
+        signal.disconnect(receiver, sender=sender)
+    try:
+        yield
+    finally:
+        for signal, receiver, sender in receivers:
+            signal.connect(receiver, sender=sender)
+
+
+def view_import(lines):
+    # BookImporter を導入する前の book_register_view の実装（print を除く）
+    # 1行ずつ重複を確認し、1冊ずつ登録する。トランザクションは使っていなかった
+    import_books = []
+    for line in lines:
+        if line[0] == "" or line[1] == "" or line[2] == "" or line[3] == "":
+            continue
+        try:
+            datetime.datetime.strptime(line[1], "%Y-%m-%d")
+        except ValueError:
+            continue
+        duplicate = False
+        author_names = line[2].split(",")
+        if Book.objects.filter(title=line[0]):
+            for same_book in list(Book.objects.filter(title=line[0])):
+                exist_authors = list(same_book.authors.values_list("name", flat=True))
+                if sorted(exist_authors) == sorted(author_names):
+                    duplicate = True
+                    break
+        for import_book in import_books:
+            if (
+                import_book.get("title") == line[0]
+                and import_book.get("authors") == author_names
+            ):
+                duplicate = True
+                break
+        if duplicate:
+            continue
+        import_books.append(
+            {
+                "title": line[0],
+                "published_date": line[1],
+                "authors": author_names,
+                "categories": line[3].split(","),
+            }
+        )
+    for import_book in import_books:
+        book = Book.objects.create(
+            title=import_book["title"], published_date=import_book["published_date"]
+        )
+        for author_name in import_book["authors"]:
+            author, _ = Author.objects.get_or_create(name=author_name)
+            book.authors.add(author)
+        for category_name in import_book["categories"]:
+            category, _ = Category.objects.get_or_create(name=category_name)
+            book.categories.add(category)
+    return len(import_books)
+
+
+def run_view_import(prefix, size):
+    with without_signal_receivers():
+        imported = view_import(generate_lines(prefix, size))
+    assert imported == size
+    return size
+
+
+def run_import(importer_class, prefix, size):
+    # 著者・カテゴリーも毎回新しい名前にして、どれも同じ条件で登録する
+    report = importer_class(batch_size=BATCH_SIZE).stream(generate_lines(prefix, size))
+    assert not report.errors and report.imported == size, report.errors
+    return report.rows
+
+
+def main(sizes):
+    if connection.vendor != "postgresql":
+        sys.exit("The COPY importer needs PostgreSQL (see DATABASES in settings)")
+    with benchmark_database():
+        print(
+            f"{'rows':>10} {'view (rows/s)':>14} {'bulk_create (rows/s)':>21}"
+            f" {'COPY (rows/s)':>14} {'COPY/view':>10} {'COPY/bulk':>10}"
+        )
+        for size in sizes:
+            view, _ = timed(run_view_import, f"V{size}-", size)
+            bulk, _ = timed(run_import, BookImporter, f"B{size}-", size)
+            copy, _ = timed(run_import, CopyBookImporter, f"C{size}-", size)
+            print(
+                f"{size:>10} {size / view:>14.0f} {size / bulk:>21.0f}"
+                f" {size / copy:>14.0f} {view / copy:>9.1f}x {bulk / copy:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main(parse_sizes(sys.argv[1:], [1000, 10000]))
@@ -0,0 +1,78 @@
+"""Concurrent GET load test for the JSON API (for comparing server setups).
+
+Start the server to measure, then:
+
+python benchmarks/load_benchmark.py URL [URL ...] [--concurrency 64] [--requests 2000]
+
+--bust-cache appends a unique query parameter to every request so that the
+response cache is bypassed and each request reaches the database.
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def fetch(url, bust):
+    # keep-aliveを使わず、1リクエストごとに接続する（サーバー側の並行性を測る）
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    if bust is not None:
+        target += f"{'&' if parts.query else '?'}_={bust}"
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    writer.write(
+        f"GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+        "Accept: application/json\r\nConnection: close\r\n\r\n".encode("ascii")
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b" ", 2)[1])
+
+
+async def worker(urls, counter, total, bust_cache, latencies, statuses):
+    while True:
+        i = next(counter)
+        if i >= total:
+            return
+        started = time.perf_counter()
+        status = await fetch(urls[i % len(urls)], i if bust_cache else None)
+        latencies.append(time.perf_counter() - started)
+        statuses[status] = statuses.get(status, 0) + 1
+
+
+async def run(urls, concurrency, total, bust_cache):
+    counter = itertools.count()
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    await asyncio.gather(
+        *[
+            worker(urls, counter, total, bust_cache, latencies, statuses)
+            for _ in range(concurrency)
+        ]
+    )
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f"requests: {total}  concurrency: {concurrency}  statuses: {statuses}")
+    print(f"throughput: {total / elapsed:.1f} req/s")
+    print(
+        f"latency: p50 {statistics.median(latencies) * 1000:.1f} ms"
+        f"  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--bust-cache", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.urls, args.concurrency, args.requests, args.bust_cache))
+
+
+if __name__ == "__main__":
+    main()
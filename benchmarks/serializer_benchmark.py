@@ -0,0 +1,36 @@
+"""Book list serialization: BookSerializer vs. serialize_book_rows().
+
+python benchmarks/serializer_benchmark.py [sizes...]   (default: 10000)
+"""
+
+import sys
+
+from common import benchmark_database, parse_sizes, seed_books, timed
+
+from book.models import Book
+from book.serializers import BOOK_FIELDS, BookSerializer, serialize_book_rows
+
+
+def model_serializer():
+    books = Book.objects.order_by("id").prefetch_related("authors", "categories")
+    return BookSerializer(books, many=True).data
+
+
+def row_serializer():
+    return serialize_book_rows(list(Book.objects.order_by("id").values(*BOOK_FIELDS)))
+
+
+def main(sizes, repeat=3):
+    with benchmark_database():
+        print(
+            f"{'books':>10} {'BookSerializer (s)':>19} {'rows (s)':>9} {'speedup':>8}"
+        )
+        for size in sizes:
+            seed_books(size)
+            before = min(timed(model_serializer)[0] for _ in range(repeat))
+            after = min(timed(row_serializer)[0] for _ in range(repeat))
+            print(f"{size:>10} {before:>19.3f} {after:>9.3f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(parse_sizes(sys.argv[1:], [10000]))
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Book, Author
+from .models import Category, Book, Author, ImportJob
 
 # Register your models here.
 
@@ -8,6 +8,9 @@ class BookAdmin(admin.ModelAdmin):
     list_display_links = ('id', 'title', 'published_date', 'label_category', 'label_author')  # 修正リンクでクリックできる項目
     list_filter = ['categories__name', 'authors__name'] # カテゴリー、著者でフィルターをかける
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('authors', 'categories') # 一覧表示で本ごとにクエリを発行しない
+
     def label_category(self, obj):
         return " / ".join([category.name for category in obj.categories.all()]) # カテゴリーを1つずつ表示
     label_category.short_description = "Categories" # Indexのラベル指定
@@ -33,3 +36,9 @@ class AuthorAdmin(admin.ModelAdmin):
 admin.site.register(Author, AuthorAdmin)
 
 
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'csv_file', 'status', 'rows', 'imported', 'created_at', 'finished_at')
+    list_display_links = ('id', 'csv_file',)
+    list_filter = ['status']
+
+admin.site.register(ImportJob, ImportJobAdmin)
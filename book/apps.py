@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class LibraryConfig(AppConfig):
     name = 'book'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,78 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .versions import request_version_key
+
+HITS_KEY = "book-api:hits"
+MISSES_KEY = "book-api:misses"
+
+
+def get_cache():
+    return caches[getattr(settings, "BOOK_API_CACHE", "default")]
+
+
+def count(key):
+    cache = get_cache()
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def cache_stats():
+    cache = get_cache()
+    return {"hits": cache.get(HITS_KEY, 0), "misses": cache.get(MISSES_KEY, 0)}
+
+
+def response_cache_key(request, names):
+    # キーにテーブルのバージョンを含めるので、書き込みがあれば古いエントリは使われなくなる
+    # Acceptによって返す形式（JSON/ブラウザ用HTML等）が変わるのでキーに含める
+    url = f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}"
+    path = hashlib.md5(url.encode("utf-8")).hexdigest()
+    return f"book-api:response:{request_version_key(request, *names)}:{path}"
+
+
+def cacheable(response):
+    # ブラウザ用のHTMLはCSRFトークンを含み、クッキーも設定するのでキャッシュしない
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not response["Content-Type"].startswith("text/html")
+    )
+
+
+def cached_response(*names):
+    # GETのレスポンス（レンダリング済みの内容）をキャッシュする
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET":
+                return view(request, *args, **kwargs)
+            cache = get_cache()
+            key = response_cache_key(request, names)
+            cached = cache.get(key)
+            if cached is not None:
+                count(HITS_KEY)
+                content, headers = cached
+                response = HttpResponse(content)
+                for header, value in headers:
+                    response[header] = value
+                return response
+
+            count(MISSES_KEY)
+            response = view(request, *args, **kwargs)
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+            if cacheable(response):
+                cache.set(key, (response.content, list(response.items())))
+            return response
+
+        return wrapper
+
+    return decorator
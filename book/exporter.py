@@ -0,0 +1,306 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, connections
+
+from . import versions
+from .models import Book
+
+EXPORT_HEADER = ["No.", "Title", "Published Date", "Author", "Category"]
+CHUNK_SIZE = 2000
+
+
+def iter_book_chunks(queryset=None, chunk_size=CHUNK_SIZE):
+    # 主キー順にchunk_size件ずつ取得し、関連はチャンクごとにprefetchする
+    if queryset is None:
+        queryset = Book.objects.all()
+    queryset = queryset.order_by("pk").prefetch_related("authors", "categories")
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        books = list(chunk[:chunk_size])
+        if not books:
+            return
+        yield books
+        last_pk = books[-1].pk
+
+
+def iter_export_rows(queryset=None, chunk_size=CHUNK_SIZE, start=1):
+    index = start - 1
+    for books in iter_book_chunks(queryset, chunk_size):
+        rows = []
+        for book in books:
+            index += 1
+            authors = ", ".join([author.name for author in book.authors.all()])
+            categories = ", ".join(
+                [category.name for category in book.categories.all()]
+            )
+            rows.append([index, book.title, book.published_date, authors, categories])
+        yield rows
+
+
+def joined_names_sql(field):
+    # 本ごとの著者名・カテゴリー名をDB側で ", " 区切りに連結する副問い合わせ
+    through = field.remote_field.through._meta.db_table
+    target = field.remote_field.model._meta.db_table
+    source_column = field.m2m_column_name()
+    target_column = field.m2m_reverse_name()
+    join = (
+        f"FROM {through} t JOIN {target} r ON r.id = t.{target_column}"
+        f" WHERE t.{source_column} = b.id"
+    )
+    if connection.vendor == "postgresql":
+        return f"(SELECT string_agg(r.name, ', ' ORDER BY t.id) {join})"
+    # SQLiteのgroup_concatは副問い合わせの並び順で連結される
+    return (
+        f"(SELECT group_concat(name, ', ') FROM (SELECT r.name {join} ORDER BY t.id))"
+    )
+
+
+def iter_aggregated_rows(chunk_size=CHUNK_SIZE, id_range=None, start=1):
+    # 1回のクエリでタイトル・出版日・著者・カテゴリーを取得する
+    # id_range=(lo, hi) を指定すると lo <= id < hi の本だけを出力する（hiはNoneで上限なし）
+    if connection.vendor not in ("postgresql", "sqlite"):
+        queryset = Book.objects.all()
+        if id_range is not None:
+            queryset = queryset.filter(pk__gte=id_range[0])
+            if id_range[1] is not None:
+                queryset = queryset.filter(pk__lt=id_range[1])
+        yield from iter_export_rows(queryset, chunk_size, start)
+        return
+    where, params = "", []
+    if id_range is not None:
+        where, params = " WHERE b.id >= %s", [id_range[0]]
+        if id_range[1] is not None:
+            where += " AND b.id < %s"
+            params.append(id_range[1])
+    sql = (
+        "SELECT b.title, b.published_date,"
+        f" COALESCE({joined_names_sql(Book._meta.get_field('authors'))}, ''),"
+        f" COALESCE({joined_names_sql(Book._meta.get_field('categories'))}, '')"
+        f" FROM {Book._meta.db_table} b{where} ORDER BY b.id"
+    )
+    index = start - 1
+    # PostgreSQLではサーバーサイドカーソルで少しずつ読み出す
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            chunk = []
+            for row in rows:
+                index += 1
+                chunk.append((index,) + tuple(row))
+            yield chunk
+
+
+def stream_csv(row_chunks, header=EXPORT_HEADER):
+    # ヘッダーはすぐに返し、以降はチャンク単位でCSV文字列にして返す
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for rows in row_chunks:
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+    yield buffer.getvalue()
+
+
+def iter_row_chunks(queryset, chunk_size=CHUNK_SIZE):
+    # values() の行を主キー順にchunk_size件ずつ返す（OFFSETを使わない）
+    queryset = queryset.order_by("pk")
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1]["id"]
+
+
+def iter_serialized_chunks(queryset=None, fields=None, chunk_size=CHUNK_SIZE):
+    # BookSerializerと同じ形式の辞書をチャンクごとに返す
+    from .serializers import (
+        BOOK_FIELDS,
+        BOOK_RELATIONS,
+        book_values_fields,
+        serialize_book_rows,
+    )
+
+    if fields is None:
+        fields = BOOK_FIELDS + BOOK_RELATIONS
+    if queryset is None:
+        queryset = Book.objects.values(*book_values_fields(fields))
+    for rows in iter_row_chunks(queryset, chunk_size):
+        yield serialize_book_rows(rows, fields)
+
+
+def stream_json_array(chunks):
+    # "[" はすぐに返し、以降はチャンクごとにエンコードして返す
+    yield "["
+    separator = ""
+    for items in chunks:
+        if items:
+            yield separator + ",".join(
+                json.dumps(item, ensure_ascii=False) for item in items
+            )
+            separator = ","
+    yield "]"
+
+
+def stream_ndjson(chunks):
+    for items in chunks:
+        yield "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+
+
+def iter_ndjson(queryset=None, chunk_size=CHUNK_SIZE):
+    # BookSerializerと同じ形式で1行に1冊ずつ出力する
+    return stream_ndjson(iter_serialized_chunks(queryset, chunk_size=chunk_size))
+
+
+def iter_file(path, chunk_size=64 * 1024):
+    with open(path, "rb") as f:
+        for data in iter(lambda: f.read(chunk_size), b""):
+            yield data
+
+
+def stream_gzip(chunks):
+    # チャンクごとに圧縮して返す（gzip形式）
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for data in chunks:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def snapshot_dir():
+    return Path(
+        getattr(settings, "BOOK_EXPORT_DIR", Path(settings.MEDIA_ROOT) / "exports")
+    )
+
+
+def snapshot_version():
+    return versions.version_key(versions.BOOK, versions.AUTHOR, versions.CATEGORY)
+
+
+def export_snapshot(version=None):
+    # 前回の出力以降に変更が無ければ、ファイルに保存済みのCSVをそのまま使う
+    if version is None:
+        version = snapshot_version()
+    directory = snapshot_dir()
+    path = directory / f"book_detail_{version}.csv"
+    if not path.exists():
+        directory.mkdir(parents=True, exist_ok=True)
+        # 同じプロセスの別スレッドと一時ファイルが重ならないよう、呼び出しごとに名前を変える
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            newline="",
+            dir=directory,
+            prefix=f".{path.name}.",
+            suffix=".tmp",
+            delete=False,
+        ) as f:
+            tmp_path = Path(f.name)
+            try:
+                for data in stream_csv(iter_aggregated_rows()):
+                    f.write(data)
+            except BaseException:
+                f.close()
+                tmp_path.unlink()
+                raise
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # 他の呼び出しが先に同じバージョンを書き終えていれば、それを使う
+            tmp_path.unlink()
+            if not path.exists():
+                raise
+        for old_path in directory.glob("book_detail_*.csv"):
+            if old_path != path:
+                try:
+                    old_path.unlink()
+                except FileNotFoundError:
+                    pass
+    return path
+
+
+def partition_bounds(partitions):
+    # 件数が均等になるようにidの範囲を分け、(lo, hi, 開始番号) のリストを返す
+    count = Book.objects.count()
+    if count == 0:
+        return []
+    partitions = max(1, min(partitions, count))
+    ids = Book.objects.order_by("pk").values_list("pk", flat=True)
+    offsets = [count * k // partitions for k in range(partitions)]
+    lows = [ids[offset] for offset in offsets]
+    highs = lows[1:] + [None]
+    return [(lo, hi, offset + 1) for lo, hi, offset in zip(lows, highs, offsets)]
+
+
+def export_partition(lo, hi, start, path):
+    # 書き出した件数を返す
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        for rows in iter_aggregated_rows(id_range=(lo, hi), start=start):
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def _init_export_worker():
+    # spawn方式で起動された場合に備えてDjangoを初期化し、接続は各プロセスで張り直す
+    import django
+
+    django.setup()
+    connections.close_all()
+
+
+def export_parallel(path, workers, partitions=None):
+    # idの範囲ごとに別プロセス・別接続で出力し、最後に1つのファイルにつなげる
+    path = Path(path)
+    bounds = partition_bounds(partitions or workers)
+    count = 0
+    part_paths = [path.with_name(f".{path.name}.part{i}") for i in range(len(bounds))]
+    try:
+        if workers > 1 and len(bounds) > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_export_worker
+            ) as executor:
+                futures = [
+                    executor.submit(export_partition, lo, hi, start, part_path)
+                    for (lo, hi, start), part_path in zip(bounds, part_paths)
+                ]
+                count = sum(future.result() for future in futures)
+        else:
+            count = sum(
+                export_partition(lo, hi, start, part_path)
+                for (lo, hi, start), part_path in zip(bounds, part_paths)
+            )
+
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerow(EXPORT_HEADER)
+            for part_path in part_paths:
+                with open(part_path, "r", encoding="utf-8", newline="") as part:
+                    shutil.copyfileobj(part, f, 1024 * 1024)
+    finally:
+        for part_path in part_paths:
+            if part_path.exists():
+                part_path.unlink()
+    return count
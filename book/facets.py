@@ -0,0 +1,50 @@
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+
+from .models import Book
+
+FACET_LIMIT = 100
+
+
+def relation_counts(field, books, limit):
+    # 中間テーブルを関連先ごとにまとめて数える（本の多い順）
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    rows = through.objects.all()
+    if books is not None:
+        rows = rows.filter(**{f"{source}_id__in": books.values("pk")})
+    rows = (
+        rows.values(f"{target}_id", f"{target}__name")
+        .annotate(count=Count(f"{source}_id"))
+        .order_by("-count", f"{target}__name")[:limit]
+    )
+    return [
+        {
+            "id": row[f"{target}_id"],
+            "name": row[f"{target}__name"],
+            "count": row["count"],
+        }
+        for row in rows
+    ]
+
+
+def year_counts(books):
+    rows = (
+        (books if books is not None else Book.objects.all())
+        .annotate(year=ExtractYear("published_date"))
+        .values("year")
+        .annotate(count=Count("pk"))
+        .order_by("year")
+    )
+    return [{"year": row["year"], "count": row["count"]} for row in rows]
+
+
+def count_facets(books=None, limit=FACET_LIMIT):
+    # カテゴリー・著者・出版年ごとの本の数を、それぞれ1回の集計クエリで求める
+    # books を指定した場合はその本だけを数える
+    return {
+        "categories": relation_counts(Book._meta.get_field("categories"), books, limit),
+        "authors": relation_counts(Book._meta.get_field("authors"), books, limit),
+        "years": year_counts(books),
+    }
@@ -1,7 +1,35 @@
 from django import forms
-from .models import Author, Category, Book
-from django.forms.widgets import CheckboxSelectMultiple
+from .models import Author, Category, Book, book_fingerprint
+from .search import AUTOCOMPLETE_MIN_LENGTH
+from django.forms.widgets import SelectMultiple
 from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteSelectMultiple(SelectMultiple):
+    # 選択済みの項目だけを<option>として出力し、他の項目はJSONのAPIで検索して追加する
+    # （全ての著者・カテゴリーを読み込まない）
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    class Media:
+        js = ('book/autocomplete.js',)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse(self.url_name)
+        attrs['data-autocomplete-min-length'] = AUTOCOMPLETE_MIN_LENGTH
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [pk for pk in value if str(pk).isdigit()]
+        queryset = self.choices.queryset.filter(pk__in=selected) if selected else []
+        return [
+            (None, [self.create_option(
+                name, obj.pk, str(obj), True, index, attrs=attrs)], index)
+            for index, obj in enumerate(queryset)
+        ]
 
 
 class AuthorForm(forms.ModelForm):
@@ -28,8 +56,8 @@ class BookForm(forms.ModelForm):
 
         widgets = {
             'published_date': forms.DateInput(attrs={"type": "date"}),
-            'categories': CheckboxSelectMultiple(),
-            'authors': CheckboxSelectMultiple()
+            'categories': AutocompleteSelectMultiple('book:category autocomplete'),
+            'authors': AutocompleteSelectMultiple('book:author autocomplete')
         }
 
         labels = {
@@ -43,13 +71,11 @@ class BookForm(forms.ModelForm):
         try:
             title = self.cleaned_data.get('title')
             authors = self.cleaned_data.get('authors')
-            authors = list(authors.values_list('name', flat=True))
-            same_books = list(Book.objects.filter(
-                title=title).exclude(id=self.instance.id))  # タイトルが同じ本のリストを作成
-            for same_book in same_books:  # タイトルが同じ本の著者を順に調べる
-                exist_authors = list(
-                    same_book.authors.values_list('name', flat=True))  # 存在する著者のリストを作成
-                if exist_authors == authors:  # 送信した著者と存在する著者が一致した場合エラー
-                    raise ValidationError("Error")
+            fingerprint = book_fingerprint(
+                title, authors.values_list('name', flat=True))
+            # タイトルと著者が一致する本があればエラー
+            if Book.objects.filter(fingerprint=fingerprint).exclude(
+                    id=self.instance.id).exists():
+                raise ValidationError("Error")
         except:
             raise ValidationError("Error")
@@ -0,0 +1,314 @@
+import csv
+import datetime
+import io
+from itertools import islice
+
+from django.db import connection, transaction
+
+from . import versions
+from .models import Author, Book, Category, book_fingerprint
+
+DATE_FORMAT = "%Y-%m-%d"
+EMPTY_ERROR = "Required field are not entered. Please fill required field"
+DATE_FORMAT_ERROR = "Wrong date format. It must be in YYYY-MM-DD"
+BATCH_SIZE = 500
+
+
+def can_return_pks():
+    features = connection.features
+    return getattr(
+        features,
+        "can_return_rows_from_bulk_insert",
+        getattr(features, "can_return_ids_from_bulk_insert", False),
+    )
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.duplicates = []
+        self.empty = False
+        self.date_format = False
+
+    @property
+    def errors(self):
+        error_list = []
+        if self.duplicates:
+            error_list.append(f"{self.duplicates} have duplicate title and author")
+        if self.empty:
+            error_list.append(EMPTY_ERROR)
+        if self.date_format:
+            error_list.append(DATE_FORMAT_ERROR)
+        return error_list
+
+
+class BookImporter:
+    def __init__(self, batch_size=BATCH_SIZE, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.report = ImportReport()
+        self.import_keys = set()
+
+    def parse(self, line):
+        self.report.rows += 1
+        # 空欄が無いかの確認
+        if len(line) < 4 or "" in line[:4]:
+            self.report.empty = True
+            return None
+
+        # 日付の入力形式の確認
+        try:
+            datetime.datetime.strptime(line[1], DATE_FORMAT)
+        except ValueError:
+            self.report.date_format = True
+            return None
+
+        author_names = line[2].split(",")
+        return {
+            "title": line[0],
+            "published_date": line[1],
+            "authors": author_names,
+            "categories": line[3].split(","),
+            "fingerprint": book_fingerprint(line[0], author_names),
+        }
+
+    def existing_keys(self, keys):
+        # 同じタイトルと著者の本が既に存在するかをハッシュでまとめて確認する
+        keys = list(keys)
+        exist_keys = set()
+        for i in range(0, len(keys), self.batch_size):
+            exist_keys.update(
+                Book.objects.filter(
+                    fingerprint__in=keys[i : i + self.batch_size]
+                ).values_list("fingerprint", flat=True)
+            )
+        return exist_keys
+
+    def validate(self, lines):
+        books = [book for book in map(self.parse, lines) if book is not None]
+        exist_keys = self.existing_keys({book["fingerprint"] for book in books})
+        import_books = []
+        for book in books:
+            key = book["fingerprint"]
+            # タイトルと著者の完全一致が無いかの確認
+            if key in exist_keys or key in self.import_keys:
+                self.report.duplicates.append(book["title"])
+                continue
+            self.import_keys.add(key)
+            import_books.append(book)
+        return import_books
+
+    def write(self, import_books):
+        books = [
+            Book(
+                title=book["title"],
+                published_date=book["published_date"],
+                fingerprint=book["fingerprint"],
+            )
+            for book in import_books
+        ]
+        Book.objects.bulk_create(books, batch_size=self.batch_size)
+        if not can_return_pks():
+            # bulk_createで主キーが返らないDBの場合は、ハッシュでまとめて引き直す
+            self.resolve_pks(books)
+        self.add_relations(books, import_books)
+        self.report.imported += len(books)
+        return books
+
+    def resolve_pks(self, books):
+        # 登録する本のハッシュは検証で重複を除いているので、新しい方の主キーを使う
+        keys = [book.fingerprint for book in books]
+        pks = {}
+        for i in range(0, len(keys), self.batch_size):
+            pks.update(
+                Book.objects.filter(fingerprint__in=keys[i : i + self.batch_size])
+                .order_by("pk")
+                .values_list("fingerprint", "pk")
+            )
+        for book in books:
+            book.pk = pks[book.fingerprint]
+
+    def update(self, books, import_books):
+        # 既存の本をまとめて更新し、著者・カテゴリーは今の関連との差分だけを書き込む
+        for book, import_book in zip(books, import_books):
+            book.title = import_book["title"]
+            book.published_date = import_book["published_date"]
+            book.fingerprint = import_book["fingerprint"]
+        Book.objects.bulk_update(
+            books,
+            ["title", "published_date", "fingerprint"],
+            batch_size=self.batch_size,
+        )
+        book_ids = [book.pk for book in books]
+        for field, pairs in self.relation_pairs(books, import_books).items():
+            current = self.current_pairs(field, book_ids)
+            removed = [pk for pair, pk in current.items() if pair not in pairs]
+            through = Book._meta.get_field(field).remote_field.through
+            for i in range(0, len(removed), self.batch_size):
+                through.objects.filter(pk__in=removed[i : i + self.batch_size]).delete()
+            self.insert_pairs(field, [pair for pair in pairs if pair not in current])
+        return books
+
+    def relation_pairs(self, books, import_books):
+        # 中間テーブルごとに、登録する (本のid, 著者・カテゴリーのid) の組を入力順で返す
+        relations = {}
+        for field, model in (("authors", Author), ("categories", Category)):
+            # バージョンは呼び出し側が最後にまとめて上げる
+            objects = model.objects.get_or_create_many(
+                (name for book in import_books for name in book[field]), bump=False
+            )
+            relations[field] = dict.fromkeys(
+                (book.pk, objects[name].pk)
+                for book, import_book in zip(books, import_books)
+                for name in import_book[field]
+            )
+        return relations
+
+    def current_pairs(self, field, book_ids):
+        # 本の今の関連を {(本のid, 著者・カテゴリーのid): 中間テーブルの主キー} で返す
+        book_field = Book._meta.get_field(field)
+        through = book_field.remote_field.through
+        column = book_field.m2m_reverse_name()
+        pairs = {}
+        for i in range(0, len(book_ids), self.batch_size):
+            for pk, book_id, target_id in through.objects.filter(
+                book_id__in=book_ids[i : i + self.batch_size]
+            ).values_list("pk", "book_id", column):
+                pairs[(book_id, target_id)] = pk
+        return pairs
+
+    def insert_pairs(self, field, pairs):
+        book_field = Book._meta.get_field(field)
+        through = book_field.remote_field.through
+        column = book_field.m2m_reverse_name()
+        through.objects.bulk_create(
+            [
+                through(book_id=book_id, **{column: target_id})
+                for book_id, target_id in pairs
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def add_relations(self, books, import_books):
+        for field, pairs in self.relation_pairs(books, import_books).items():
+            self.insert_pairs(field, pairs)
+
+    def run(self, lines):
+        # エラーが1件でもあれば何も登録しない
+        import_books = self.validate(lines)
+        if not self.report.errors:
+            with transaction.atomic():
+                self.write(import_books)
+                self.bump_versions()
+        return self.report
+
+    def bump_versions(self):
+        # bulk_createではシグナルが送られないので、ここでバージョンを上げる
+        if self.report.imported:
+            versions.bump(versions.BOOK, versions.AUTHOR, versions.CATEGORY)
+
+    def stream(self, lines):
+        # batch_size行ずつ検証・登録し、メモリ使用量をファイルサイズに依存させない
+        # エラーが見つかった場合はトランザクションごと取り消す
+        lines = iter(lines)
+        with transaction.atomic():
+            for chunk in iter(lambda: list(islice(lines, self.batch_size)), []):
+                import_books = self.validate(chunk)
+                if not self.report.errors:
+                    self.write(import_books)
+                if self.progress is not None:
+                    self.progress(self.report)
+            if self.report.errors:
+                transaction.set_rollback(True)
+                self.report.imported = 0
+            else:
+                self.bump_versions()
+        return self.report
+
+
+class CopyBookImporter(BookImporter):
+    # PostgreSQL用：検証済みの行をCOPYで一時テーブルに流し込み、SQLでまとめて登録する
+    staging_table = "book_import_staging"
+
+    def create_staging_table(self, cursor):
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {self.staging_table} ("
+            " book_id integer,"
+            " title varchar(100) NOT NULL,"
+            " published_date date NOT NULL,"
+            " authors text NOT NULL,"
+            " categories text NOT NULL,"
+            " fingerprint varchar(32) NOT NULL"
+            ") ON COMMIT DROP"
+        )
+        cursor.execute(f"TRUNCATE {self.staging_table}")
+
+    def copy_rows(self, cursor, import_books):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for book in import_books:
+            writer.writerow(
+                [
+                    book["title"],
+                    book["published_date"],
+                    ",".join(book["authors"]),
+                    ",".join(book["categories"]),
+                    book["fingerprint"],
+                ]
+            )
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {self.staging_table}"
+            " (title, published_date, authors, categories, fingerprint)"
+            " FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+    def insert_names(self, cursor, model, column):
+        cursor.execute(
+            f"INSERT INTO {model._meta.db_table} (name)"
+            f" SELECT DISTINCT unnest(string_to_array({column}, ','))"
+            f" FROM {self.staging_table}"
+            " ON CONFLICT (name) DO NOTHING"
+        )
+
+    def insert_relations(self, cursor, field, column):
+        through = field.remote_field.through._meta
+        target = field.remote_field.model._meta.db_table
+        cursor.execute(
+            f"INSERT INTO {through.db_table}"
+            f" ({field.m2m_column_name()}, {field.m2m_reverse_name()})"
+            f" SELECT DISTINCT s.book_id, t.id FROM {self.staging_table} s"
+            f" CROSS JOIN LATERAL unnest(string_to_array(s.{column}, ',')) AS n(name)"
+            f" JOIN {target} t ON t.name = n.name"
+        )
+
+    def write(self, import_books):
+        book_table = Book._meta.db_table
+        with connection.cursor() as cursor:
+            self.create_staging_table(cursor)
+            self.copy_rows(cursor, import_books)
+            self.insert_names(cursor, Author, "authors")
+            self.insert_names(cursor, Category, "categories")
+            # 先に主キーを採番しておき、中間テーブルの登録に使う
+            cursor.execute(
+                f"UPDATE {self.staging_table}"
+                f" SET book_id = nextval(pg_get_serial_sequence('{book_table}', 'id'))"
+            )
+            cursor.execute(
+                f"INSERT INTO {book_table} (id, title, published_date, fingerprint)"
+                f" SELECT book_id, title, published_date, fingerprint"
+                f" FROM {self.staging_table}"
+            )
+            self.insert_relations(cursor, Book._meta.get_field("authors"), "authors")
+            self.insert_relations(
+                cursor, Book._meta.get_field("categories"), "categories"
+            )
+        self.report.imported += len(import_books)
+
+
+def get_importer(**kwargs):
+    if connection.vendor == "postgresql":
+        return CopyBookImporter(**kwargs)
+    return BookImporter(**kwargs)
@@ -0,0 +1,113 @@
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+from io import TextIOWrapper
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .importer import BookImporter
+from .models import ImportJob
+
+_executor = None
+
+# プロセスの再起動で止まったジョブに記録するエラー
+INTERRUPTED_ERROR = "The import was interrupted by a server restart"
+
+
+def get_executor():
+    # 外部のブローカーを使わず、プロセス内のスレッドでインポートを実行する
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "BOOK_IMPORT_WORKERS", 2),
+            thread_name_prefix="book-import",
+        )
+    return _executor
+
+
+def progress_key(job_id):
+    return f"book:import-job:{job_id}:progress"
+
+
+def enqueue(job):
+    # ジョブの保存がコミットされてからワーカーに渡す
+    transaction.on_commit(lambda: get_executor().submit(_work, job.pk))
+
+
+def _work(job_id):
+    try:
+        run_import_job(job_id)
+    finally:
+        connection.close()
+
+
+def run_import_job(job_id):
+    job = ImportJob.objects.get(pk=job_id)
+    job.status = ImportJob.RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=["status", "started_at"])
+
+    # インポート中はトランザクション内なので、進捗はキャッシュ経由で公開する
+    def progress(report):
+        cache.set(progress_key(job_id), {"rows": report.rows}, 60 * 60)
+
+    try:
+        with job.csv_file.open("rb") as f:
+            csv_file = csv.reader(TextIOWrapper(f, encoding="utf-8"))
+            next(csv_file, None)
+            report = BookImporter(progress=progress).stream(csv_file)
+    except Exception as e:
+        job.status = ImportJob.FAILED
+        job.errors = json.dumps([str(e)])
+    else:
+        job.status = ImportJob.FAILED if report.errors else ImportJob.SUCCEEDED
+        job.rows = report.rows
+        job.imported = report.imported
+        job.errors = json.dumps(report.errors)
+    job.finished_at = timezone.now()
+    job.save()
+    cache.delete(progress_key(job_id))
+    job.csv_file.delete(save=False)
+    return job
+
+
+def unfinished_jobs():
+    # ジョブはプロセス内で実行されるので、プロセスが止まると待機中・実行中のまま残る
+    return ImportJob.objects.filter(
+        status__in=[ImportJob.QUEUED, ImportJob.RUNNING]
+    ).order_by("pk")
+
+
+def fail_job(job, message):
+    job.status = ImportJob.FAILED
+    job.errors = json.dumps([message])
+    job.finished_at = timezone.now()
+    job.save()
+    cache.delete(progress_key(job.pk))
+    job.csv_file.delete(save=False)
+    return job
+
+
+def job_status(job):
+    rows = job.rows
+    if job.status == ImportJob.RUNNING:
+        rows = cache.get(progress_key(job.pk), {}).get("rows", 0)
+    rows_per_second = None
+    if job.started_at is not None:
+        elapsed = ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+        if elapsed > 0:
+            rows_per_second = round(rows / elapsed, 1)
+    return {
+        "id": job.pk,
+        "status": job.status,
+        "rows": rows,
+        "imported": job.imported,
+        "rows_per_second": rows_per_second,
+        "errors": json.loads(job.errors) if job.errors else [],
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
@@ -0,0 +1,34 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from book.exporter import export_parallel
+
+
+class Command(BaseCommand):
+    help = "Export every book to a CSV file in the book_shelf_view layout"
+
+    def add_arguments(self, parser):
+        parser.add_argument("file")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument(
+            "--partitions",
+            type=int,
+            default=None,
+            help="Number of id ranges to split the export into (default: --workers)",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = export_parallel(
+            options["file"], options["workers"], options["partitions"]
+        )
+        elapsed = time.perf_counter() - started
+        rows_per_second = count / elapsed if elapsed > 0 else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {count} books to {options['file']}"
+                f" in {elapsed:.2f}s ({rows_per_second:.0f} rows/s)"
+            )
+        )
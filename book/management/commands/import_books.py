@@ -0,0 +1,36 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from book.importer import get_importer
+
+
+class Command(BaseCommand):
+    help = "Import books from a CSV file in the book_upload_file.csv layout"
+
+    def add_arguments(self, parser):
+        parser.add_argument("file")
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        importer = get_importer(batch_size=options["batch_size"])
+        started = time.perf_counter()
+        try:
+            with open(options["file"], encoding="utf-8", newline="") as f:
+                csv_file = csv.reader(f)
+                next(csv_file, None)
+                report = importer.stream(csv_file)
+        except OSError as e:
+            raise CommandError(e)
+        elapsed = time.perf_counter() - started
+
+        if report.errors:
+            raise CommandError("\n".join(report.errors))
+        rows_per_second = report.rows / elapsed if elapsed > 0 else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {report.imported} books from {report.rows} rows"
+                f" in {elapsed:.2f}s ({rows_per_second:.0f} rows/s)"
+            )
+        )
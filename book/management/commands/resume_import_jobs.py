@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from book.jobs import INTERRUPTED_ERROR, fail_job, run_import_job, unfinished_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the import jobs left queued or running by a stopped server process,"
+        " or mark them failed with --fail"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fail",
+            action="store_true",
+            help="Mark unfinished jobs as failed instead of running them again",
+        )
+
+    def handle(self, *args, **options):
+        # 実行中だったジョブのインポートはトランザクションごと取り消されているので、
+        # 最初からやり直せる
+        for job in unfinished_jobs():
+            if options["fail"]:
+                job = fail_job(job, INTERRUPTED_ERROR)
+            else:
+                job = run_import_job(job.pk)
+            self.stdout.write(f"Import job {job.pk}: {job.status}")
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.17 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+def fill_fingerprints(apps, schema_editor):
+    from book.models import book_fingerprint
+
+    Book = apps.get_model('book', 'Book')
+    books = list(Book.objects.prefetch_related('authors'))
+    for book in books:
+        book.fingerprint = book_fingerprint(
+            book.title, [author.name for author in book.authors.all()])
+    Book.objects.bulk_update(books, ['fingerprint'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0005_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='fingerprint',
+            field=models.CharField(default='', editable=False, max_length=32),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_fingerprints, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='book',
+            name='fingerprint',
+            field=models.CharField(db_index=True, editable=False, max_length=32),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.17 on 2026-10-18 12:10
+
+from django.db import migrations
+
+# 部分一致検索（UPPER(col::text) LIKE ...）で使われるトライグラムのGINインデックス
+# PostgreSQL以外ではPython側の転置インデックス（book/search.py）を使うので何もしない
+SEARCH_INDEXES = [
+    ('book_book_title_trgm_idx', 'book_book', 'title'),
+    ('book_author_name_trgm_idx', 'book_author', 'name'),
+    ('book_category_name_trgm_idx', 'book_category', 'name'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table}'
+            f' USING gin (UPPER({column}::text) gin_trgm_ops)')
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0008_book_published_date_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
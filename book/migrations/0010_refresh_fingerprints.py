@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def refresh_fingerprints(apps, schema_editor):
+    # 同じ著者が重複していた行のハッシュを、重複を除いた計算方法で作り直す
+    from book.models import book_fingerprint
+
+    Book = apps.get_model('book', 'Book')
+    books = list(Book.objects.prefetch_related('authors'))
+    for book in books:
+        book.fingerprint = book_fingerprint(
+            book.title, [author.name for author in book.authors.all()])
+    Book.objects.bulk_update(books, ['fingerprint'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0009_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(refresh_fingerprints, migrations.RunPython.noop),
+    ]
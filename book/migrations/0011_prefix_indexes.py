@@ -0,0 +1,37 @@
+# Generated by Django 2.2.17 on 2026-10-18 18:30
+
+from django.db import migrations
+
+# トライグラムが作れない3文字未満の入力の候補（UPPER(col::text) LIKE 'xx%'）で使われる
+# ロケールに関係なくLIKEの前方一致に使えるよう text_pattern_ops にする
+PREFIX_INDEXES = [
+    ('book_author_name_prefix_idx', 'book_author', 'name'),
+    ('book_category_name_prefix_idx', 'book_category', 'name'),
+]
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in PREFIX_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table}'
+            f' (UPPER({column}::text) text_pattern_ops)')
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in PREFIX_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0010_refresh_fingerprints'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
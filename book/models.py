@@ -1,9 +1,57 @@
+import hashlib
+import unicodedata
+
 from django.db import models
 
 
+def normalize_name(name):
+    return unicodedata.normalize("NFC", name).strip()
+
+
+def book_fingerprint(title, author_names):
+    # タイトルと著者（順不同）の組み合わせから重複判定用のハッシュを作る
+    # 本と著者の関連は1つしか作られないので、同じ著者の重複は1人として扱う
+    key = "\x1f".join(
+        [normalize_name(title)]
+        + sorted({normalize_name(name) for name in author_names})
+    )
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class NamedQuerySet(models.QuerySet):
+    # 名前のリストをまとめて解決し、存在しないものだけを一括で作成する
+    # {name: object} の辞書を返す
+    def get_or_create_many(self, names, batch_size=500, bump=True):
+        # 一括登録のように最後にまとめてバージョンを上げる場合は bump=False にする
+        # （長いトランザクションの途中でバージョンの行をロックしない）
+        names = list(dict.fromkeys(names))
+        found = {}
+        for i in range(0, len(names), batch_size):
+            chunk = names[i:i + batch_size]
+            found.update((obj.name, obj) for obj in self.filter(name__in=chunk))
+        missing = [name for name in names if name not in found]
+        if missing:
+            self.bulk_create(
+                [self.model(name=name) for name in missing],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            if bump:
+                # bulk_createではpost_saveが送られないので、ここでバージョンを上げる
+                from .signals import bump_model_version
+
+                bump_model_version(self.model)
+            for i in range(0, len(missing), batch_size):
+                chunk = missing[i:i + batch_size]
+                found.update((obj.name, obj) for obj in self.filter(name__in=chunk))
+        return found
+
+
 class Category(models.Model):
     name = models.CharField(max_length=20, unique=True)
 
+    objects = NamedQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -11,6 +59,8 @@ class Category(models.Model):
 class Author(models.Model):
     name = models.CharField(max_length=50, unique=True)
 
+    objects = NamedQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -20,6 +70,69 @@ class Book(models.Model):
     published_date = models.DateField(auto_now=False)
     categories = models.ManyToManyField(Category)
     authors = models.ManyToManyField(Author)
+    fingerprint = models.CharField(max_length=32, db_index=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # 出版日順のキーセットページネーション用
+            models.Index(fields=["published_date", "id"], name="book_book_pub_date_id_idx"),
+        ]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        # 著者の追加・削除時はシグナルでハッシュを更新する
+        if self.pk is not None:
+            author_names = self.authors.values_list("name", flat=True)
+            self.fingerprint = book_fingerprint(self.title, author_names)
+        elif not self.fingerprint:
+            self.fingerprint = book_fingerprint(self.title, [])
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def refresh_fingerprints(cls, book_ids):
+        # 著者が変わった本のハッシュをまとめて計算し直す
+        books = list(cls.objects.filter(pk__in=book_ids).only("title"))
+        names = {}
+        for book_id, name in cls.authors.through.objects.filter(
+            book_id__in=book_ids
+        ).values_list("book_id", "author__name"):
+            names.setdefault(book_id, []).append(name)
+        for book in books:
+            book.fingerprint = book_fingerprint(book.title, names.get(book.pk, []))
+        cls.objects.bulk_update(books, ["fingerprint"])
+
+
+class ImportJob(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    csv_file = models.FileField(upload_to="imports/")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    rows = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    errors = models.TextField(blank=True)  # エラーメッセージのJSON配列
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.csv_file.name} ({self.status})"
+
+
+class TableVersion(models.Model):
+    # 書き込みがあるたびに増える、テーブルごとのバージョン番号
+    name = models.CharField(max_length=20, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
@@ -0,0 +1,137 @@
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    # OFFSETを使わず、最後に返した行のキーより後ろを取得するページネーション
+    # orderingsのキーを ?ordering= で選択する（最後のフィールドは一意であること）
+    orderings = {"id": ("id",)}
+    default_ordering = "id"
+    page_size = api_settings.PAGE_SIZE or 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_ordering(self, request):
+        name = request.query_params.get(
+            self.ordering_query_param, self.default_ordering
+        )
+        return self.orderings.get(name, self.orderings[self.default_ordering])
+
+    def encode_cursor(self, keys, reverse):
+        data = json.dumps({"k": keys, "r": reverse}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+            keys, reverse = data["k"], bool(data["r"])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(keys, list) or len(keys) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # キーの型が合わないとfilter()で例外になるので、フィールドの型に変換しておく
+        try:
+            keys = [
+                model._meta.get_field(field).to_python(key)
+                for field, key in zip(self.ordering, keys)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in keys:
+            raise NotFound(self.invalid_cursor_message)
+        return keys, reverse
+
+    def get_keys(self, item):
+        keys = []
+        for field in self.ordering:
+            value = item[field] if isinstance(item, dict) else getattr(item, field)
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+            keys.append(value)
+        return keys
+
+    def keyset_filter(self, keys, reverse):
+        # (a, b) > (x, y) を a > x OR (a = x AND b > y) に展開する
+        lookup = "lt" if reverse else "gt"
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            term = Q(**{f"{field}__{lookup}": keys[i]})
+            for prev_field, prev_key in zip(self.ordering[:i], keys[:i]):
+                term &= Q(**{prev_field: prev_key})
+            condition |= term
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request)
+        keys, reverse = self.decode_cursor(request, queryset.model)
+
+        if keys is not None:
+            queryset = queryset.filter(self.keyset_filter(keys, reverse))
+        order = [f"-{field}" if reverse else field for field in self.ordering]
+        results = list(queryset.order_by(*order)[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = keys is not None, has_more
+        self.page = results
+        return results
+
+    def get_link(self, item, reverse):
+        url = self.request.build_absolute_uri()
+        token = self.encode_cursor(self.get_keys(item), reverse)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.get_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param
+            )
+        return self.get_link(self.page[0], reverse=True)
+
+    def get_paginated_data(self, data):
+        return {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+
+class BookPagination(KeysetPagination):
+    orderings = {"id": ("id",), "published_date": ("published_date", "id")}
@@ -0,0 +1,81 @@
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+try:
+    import msgpack
+except ImportError:  # MessagePackは任意（インストールされていればAPIで使える）
+    msgpack = None
+
+
+class NDJSONRenderer(BaseRenderer):
+    # 1行に1件のJSON（一覧のストリーミング用。エラー等の単体のデータは1行で返す）
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        return "".join(
+            json.dumps(item, cls=encoders.JSONEncoder, ensure_ascii=False) + "\n"
+            for item in items
+        ).encode("utf-8")
+
+
+class MessagePackRenderer(BaseRenderer):
+    # JSONよりエンコード・デコードが速く、サイズも小さいバイナリ形式
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # 日付などJSONに変換できない値はJSONと同じ文字列にする
+        return msgpack.packb(data, default=encoders.JSONEncoder().default)
+
+
+class MessagePackParser(BaseParser):
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise ParseError(f"MessagePack parse error - {e}")
+
+
+def format_requested(request, renderer):
+    # ETagなど、DRFの内容ネゴシエーションより前に返す形式を判定する
+    if request.GET.get(api_settings.URL_FORMAT_OVERRIDE) == renderer.format:
+        return True
+    return renderer.media_type in request.META.get("HTTP_ACCEPT", "")
+
+
+def response_format(request):
+    for renderer in OPTIONAL_RENDERERS + [NDJSONRenderer]:
+        if format_requested(request, renderer):
+            return renderer.format
+    # ブラウザにはBrowsable APIのHTMLを返すので、JSONとは別の形式として扱う
+    override = request.GET.get(api_settings.URL_FORMAT_OVERRIDE)
+    if override == "api" or (
+        override is None and "text/html" in request.META.get("HTTP_ACCEPT", "")
+    ):
+        return "html"
+    return "json"
+
+
+OPTIONAL_RENDERERS = [MessagePackRenderer] if msgpack is not None else []
+API_RENDERERS = list(api_settings.DEFAULT_RENDERER_CLASSES) + OPTIONAL_RENDERERS
+API_PARSERS = list(api_settings.DEFAULT_PARSER_CLASSES) + (
+    [MessagePackParser] if msgpack is not None else []
+)
+# 本の一覧はNDJSONでのストリーミングにも対応する
+BOOK_RENDERERS = API_RENDERERS + [NDJSONRenderer]
@@ -0,0 +1,168 @@
+import threading
+import unicodedata
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Length
+
+from . import versions
+
+# SQLiteで id__in に渡せる件数の上限（超える場合はLIKEで絞り込む）
+MAX_ID_FILTER = 900
+# pg_trgmは3文字ずつの組で索引を作るので、それより短い語はトライグラムで絞り込めない
+TRIGRAM_LENGTH = 3
+# 著者・カテゴリーの候補を検索する最小の文字数（1文字ではほぼ全件が候補になる）
+AUTOCOMPLETE_MIN_LENGTH = 2
+
+
+def normalize(text):
+    # 全角・半角と大文字・小文字の違いを無視する
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def search_terms(query):
+    return normalize(query).split()
+
+
+def ngrams(text):
+    # 1文字と2文字の組み合わせ（日本語は単語の区切りが無いので文字単位で引く）
+    grams = set(text)
+    grams.update(text[i : i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class SearchIndex:
+    # PostgreSQL以外で使う、文字のバイグラムによる転置インデックス
+    def __init__(self, rows):
+        self.texts = {}
+        self.postings = {}
+        for pk, text in rows:
+            text = normalize(text)
+            self.texts[pk] = text
+            for gram in ngrams(text):
+                self.postings.setdefault(gram, set()).add(pk)
+
+    def candidates(self, term):
+        grams = [term] if len(term) == 1 else ngrams(term) - set(term)
+        ids = None
+        for gram in sorted(grams, key=lambda gram: len(self.postings.get(gram, ()))):
+            posting = self.postings.get(gram, set())
+            ids = posting.copy() if ids is None else ids & posting
+            if not ids:
+                break
+        return ids or set()
+
+    def match(self, query):
+        # 全ての語を部分文字列として含むもの（インデックスで候補を絞ってから確認する）
+        terms = search_terms(query)
+        if not terms:
+            return set(self.texts)
+        ids = None
+        for term in sorted(terms, key=len, reverse=True):
+            found = self.candidates(term)
+            ids = found if ids is None else ids & found
+            if not ids:
+                return set()
+        return {pk for pk in ids if all(term in self.texts[pk] for term in terms)}
+
+    def rank(self, pk, query, terms):
+        # 完全一致 > 前方一致 > 語の先頭で一致 > 部分一致、その後は類似度の高い順
+        text = self.texts[pk]
+        if text == query:
+            kind = 0
+        elif text.startswith(query):
+            kind = 1
+        elif any(text.startswith(term) or f" {term}" in text for term in terms):
+            kind = 2
+        else:
+            kind = 3
+        query_grams, text_grams = ngrams(query), ngrams(text)
+        similarity = len(query_grams & text_grams) / len(query_grams | text_grams)
+        return (kind, -similarity, len(text), pk)
+
+    def search(self, query, limit=None):
+        terms = search_terms(query)
+        query = " ".join(terms)
+        ids = sorted(self.match(query), key=lambda pk: self.rank(pk, query, terms))
+        return ids[:limit]
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_index(model, field, version_name):
+    # テーブルのバージョンが変わっていれば作り直す
+    version = versions.get_versions(version_name)[0]
+    key = (model._meta.label, field)
+    with _lock:
+        cached = _indexes.get(key)
+        if cached is None or cached[0] != version:
+            rows = model.objects.values_list("pk", field).iterator()
+            cached = _indexes[key] = (version, SearchIndex(rows))
+        return cached[1]
+
+
+def clear_indexes():
+    with _lock:
+        _indexes.clear()
+
+
+def filter_like(queryset, field, query):
+    # 大文字・小文字はicontainsが無視するので、全角・半角だけ揃える
+    for term in unicodedata.normalize("NFKC", query).split():
+        queryset = queryset.filter(**{f"{field}__icontains": term})
+    return queryset
+
+
+def filter_contains(queryset, field, query, version_name):
+    # field__icontains の置き換え：空白で区切った全ての語を含む行に絞り込む
+    # PostgreSQLではトライグラムのGINインデックス（0009_search_indexes）が使われる
+    # ただし3文字未満の語からはトライグラムが作れないので、その語の条件は
+    # インデックスで絞り込めずに全行を確認する（結果は同じで、遅くなるだけ）
+    if connection.vendor == "postgresql":
+        return filter_like(queryset, field, query)
+    ids = get_index(queryset.model, field, version_name).match(query)
+    if len(ids) > MAX_ID_FILTER:
+        return filter_like(queryset, field, query)
+    return queryset.filter(pk__in=ids)
+
+
+def ranked_ids(model, field, query, version_name, limit):
+    # 関連度の高い順に主キーを返す
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        query = " ".join(unicodedata.normalize("NFKC", query).split())
+        queryset = filter_contains(model.objects.all(), field, query, version_name)
+        queryset = queryset.annotate(
+            prefix=Case(
+                When(**{f"{field}__iexact": query}, then=Value(0)),
+                When(**{f"{field}__istartswith": query}, then=Value(1)),
+                default=Value(2),
+                output_field=IntegerField(),
+            ),
+            similarity=TrigramSimilarity(field, query),
+        )
+        return list(
+            queryset.order_by("prefix", "-similarity", "pk").values_list(
+                "pk", flat=True
+            )[:limit]
+        )
+    return get_index(model, field, version_name).search(query, limit)
+
+
+def autocomplete_ids(model, field, query, version_name, limit):
+    # 入力中の名前の候補：短すぎる入力には何も返さない
+    query = " ".join(unicodedata.normalize("NFKC", query).split())
+    if len(query) < AUTOCOMPLETE_MIN_LENGTH:
+        return []
+    if connection.vendor == "postgresql" and len(query) < TRIGRAM_LENGTH:
+        # トライグラムのインデックスが使えないので、前方一致だけを
+        # text_pattern_opsのインデックス（0011_prefix_indexes）で引く
+        return list(
+            model.objects.filter(**{f"{field}__istartswith": query})
+            .order_by(Length(field), field, "pk")
+            .values_list("pk", flat=True)[:limit]
+        )
+    return ranked_ids(model, field, query, version_name, limit)
@@ -1,6 +1,8 @@
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import IntegerField, ModelSerializer, ValidationError
 
-from .models import Book, Category, Author
+from .models import Book, Category, Author, book_fingerprint
+
+DUPLICATE_ERROR = "Book with the same title and authors already exists"
 
 
 class AuthorSerializer(ModelSerializer):
@@ -29,6 +31,23 @@ class BookSerializer(ModelSerializer):
         model = Book
         fields = ["id", "title", "published_date", "categories", "authors"]
 
+    def validate(self, data):
+        title = data.get("title", getattr(self.instance, "title", None))
+        if "authors" in data:
+            author_names = [author["name"] for author in data["authors"]]
+        elif self.instance is not None:
+            author_names = self.instance.authors.values_list("name", flat=True)
+        else:
+            author_names = []
+        same_books = Book.objects.filter(
+            fingerprint=book_fingerprint(title, author_names)
+        )
+        if self.instance is not None:
+            same_books = same_books.exclude(id=self.instance.id)
+        if same_books.exists():
+            raise ValidationError(DUPLICATE_ERROR)
+        return data
+
     def create(self, validated_data):
         categories = validated_data.pop("categories", [])
         authors = validated_data.pop("authors", [])
@@ -43,20 +62,177 @@ class BookSerializer(ModelSerializer):
         return book
 
     def update(self, instance, validated_data):
-        print(instance)
-        categories = validated_data.pop("categories", [])
-        authors = validated_data.pop("authors", [])
-        for item in validated_data:
-            print(item)
-            if Book._meta.get_field(item):
-                setattr(instance, item, validated_data[item])
-        instance.categories.clear()
-        instance.authors.clear()
-        for category_name in categories:
-            category, _ = Category.objects.update_or_create(name=category_name["name"])
-            instance.categories.add(category)
-        for author_name in authors:
-            author, _ = Author.objects.update_or_create(name=author_name["name"])
-            instance.authors.add(author)
+        categories = validated_data.pop("categories", None)
+        authors = validated_data.pop("authors", None)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # set() は現在の関連との差分だけを中間テーブルに反映する
+        if categories is not None:
+            instance.categories.set(
+                Category.objects.get_or_create_many(
+                    category["name"] for category in categories
+                ).values()
+            )
+        if authors is not None:
+            instance.authors.set(
+                Author.objects.get_or_create_many(
+                    author["name"] for author in authors
+                ).values()
+            )
         instance.save()
         return instance
+
+
+class BookItemSerializer(BookSerializer):
+    # 一括登録・更新用：idがあれば更新、無ければ新規登録
+    # 重複の確認は validate_book_items でまとめて行う
+    id = IntegerField(required=False)
+
+    def validate(self, data):
+        return data
+
+
+def validate_book_items(items):
+    # 各項目を検証し、(登録・更新する本のリスト, 項目ごとのエラーのリスト) を返す
+    books, errors = [], []
+    for index, item in enumerate(items):
+        serializer = BookItemSerializer(data=item)
+        if not serializer.is_valid():
+            errors.append({"index": index, "errors": serializer.errors})
+            continue
+        data = serializer.validated_data
+        author_names = [author["name"] for author in data["authors"]]
+        books.append(
+            {
+                "index": index,
+                "id": data.get("id"),
+                "title": data["title"],
+                "published_date": data["published_date"],
+                "authors": author_names,
+                "categories": [category["name"] for category in data["categories"]],
+                "fingerprint": book_fingerprint(data["title"], author_names),
+            }
+        )
+
+    # 更新対象の本の存在と、タイトル・著者の重複をまとめて確認する
+    update_ids = {book["id"] for book in books if book["id"] is not None}
+    exist_ids = set(Book.objects.filter(id__in=update_ids).values_list("id", flat=True))
+    same_books = (
+        dict(
+            Book.objects.filter(
+                fingerprint__in={book["fingerprint"] for book in books}
+            ).values_list("fingerprint", "id")
+        )
+        if books
+        else {}
+    )
+    seen, seen_ids = set(), set()
+    valid_books = []
+    for book in books:
+        if book["id"] is not None and book["id"] not in exist_ids:
+            errors.append(
+                {"index": book["index"], "errors": {"id": ["The book does not exist"]}}
+            )
+            continue
+        # 同じ本を1回のリクエストで2回更新すると、後の更新が前の差分を上書きしてしまう
+        if book["id"] in seen_ids:
+            errors.append(
+                {
+                    "index": book["index"],
+                    "errors": {"id": ["The book is given more than once"]},
+                }
+            )
+            continue
+        if book["id"] is not None:
+            seen_ids.add(book["id"])
+        same_id = same_books.get(book["fingerprint"])
+        if book["fingerprint"] in seen or (
+            same_id is not None and same_id != book["id"]
+        ):
+            errors.append(
+                {
+                    "index": book["index"],
+                    "errors": {"non_field_errors": [DUPLICATE_ERROR]},
+                }
+            )
+            continue
+        seen.add(book["fingerprint"])
+        valid_books.append(book)
+    errors.sort(key=lambda error: error["index"])
+    return valid_books, errors
+
+
+BOOK_FIELDS = ("id", "title", "published_date")
+BOOK_RELATIONS = ("categories", "authors")
+
+
+def query_param_list(params, name):
+    value = params.get(name)
+    names = [item.strip() for item in value.split(",")] if value else []
+    return [item for item in names if item] or None
+
+
+def requested_book_fields(params):
+    # ?fields= で返すフィールドを絞り込み、?expand= で著者・カテゴリーを追加する
+    # どちらも指定が無ければ全てのフィールドを返す
+    fields = query_param_list(params, "fields")
+    expand = query_param_list(params, "expand")
+    if fields is None and expand is None:
+        return BOOK_FIELDS + BOOK_RELATIONS
+    errors = {}
+    unknown = set(fields or ()) - set(BOOK_FIELDS + BOOK_RELATIONS)
+    if unknown:
+        errors["fields"] = [f"Unknown fields: {', '.join(sorted(unknown))}"]
+    unknown = set(expand or ()) - set(BOOK_RELATIONS)
+    if unknown:
+        errors["expand"] = [f"Unknown relations: {', '.join(sorted(unknown))}"]
+    if errors:
+        raise ValidationError(errors)
+    selected = set(BOOK_FIELDS if fields is None else fields) | set(expand or ())
+    return tuple(field for field in BOOK_FIELDS + BOOK_RELATIONS if field in selected)
+
+
+def book_values_fields(fields, extra=()):
+    # values() で取得するカラム（idと並び替えのキーは常に含める）
+    columns = ("id",) + tuple(field for field in fields if field in BOOK_FIELDS)
+    return tuple(dict.fromkeys(columns + tuple(extra)))
+
+
+def related_rows(field, book_ids):
+    # {book_id: [{"id": ..., "name": ...}, ...]} を1回のクエリで作る
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    related = {}
+    rows = (
+        through.objects.filter(**{f"{source}_id__in": book_ids})
+        .order_by("id")
+        .values_list(f"{source}_id", f"{target}_id", f"{target}__name")
+    )
+    for book_id, related_id, name in rows:
+        related.setdefault(book_id, []).append({"id": related_id, "name": name})
+    return related
+
+
+def serialize_book_rows(rows, fields=BOOK_FIELDS + BOOK_RELATIONS):
+    # 一覧取得用：values() の行からBookSerializerと同じ形のデータを作る
+    # フィールドごとのto_representationを通さないので大量の本でも速い
+    # 著者・カテゴリーは要求された場合のみ取得する
+    book_ids = [row["id"] for row in rows]
+    related = {
+        name: related_rows(Book._meta.get_field(name), book_ids)
+        for name in BOOK_RELATIONS
+        if name in fields
+    }
+    books = []
+    for row in rows:
+        book = {}
+        for field in fields:
+            if field in related:
+                book[field] = related[field].get(row["id"], [])
+            elif field == "published_date":
+                book[field] = row[field].isoformat()
+            else:
+                book[field] = row[field]
+        books.append(book)
+    return books
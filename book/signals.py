@@ -0,0 +1,64 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import versions
+from .models import Author, Book, Category
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def book_authors_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        Book.refresh_fingerprints([instance.pk])
+    elif action == "post_clear":
+        Book.refresh_fingerprints(getattr(instance, "_cleared_book_ids", []))
+    else:
+        Book.refresh_fingerprints(pk_set)
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def remember_cleared_books(sender, instance, action, reverse, **kwargs):
+    # author.book_set.clear() の後では対象の本が分からないので先に控えておく
+    if action == "pre_clear" and reverse:
+        instance._cleared_book_ids = list(
+            instance.book_set.values_list("pk", flat=True)
+        )
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, **kwargs):
+    if not created:
+        Book.refresh_fingerprints(instance.book_set.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Author)
+def author_deleting(sender, instance, **kwargs):
+    instance._book_ids = list(instance.book_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, **kwargs):
+    Book.refresh_fingerprints(getattr(instance, "_book_ids", []))
+
+
+# 書き込みのたびにテーブルのバージョンを上げ、キャッシュや出力ファイルを無効にする
+VERSIONED_MODELS = {
+    Book: versions.BOOK,
+    Author: versions.AUTHOR,
+    Category: versions.CATEGORY,
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_model_version(sender, **kwargs):
+    if sender in VERSIONED_MODELS:
+        versions.bump(VERSIONED_MODELS[sender])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.categories.through)
+def bump_relation_version(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        versions.bump(versions.BOOK)
@@ -0,0 +1,52 @@
+// 著者・カテゴリーの選択欄：入力した名前でAPIを検索し、選んだ候補を<select>に追加する
+document.addEventListener("DOMContentLoaded", function () {
+    document.querySelectorAll("select[data-autocomplete-url]").forEach(function (select) {
+        var input = document.createElement("input");
+        var results = document.createElement("ul");
+        var timer = null;
+        // サーバーと同じ最小の文字数（短い入力ではAPIを呼ばない）
+        var minLength = parseInt(select.dataset.autocompleteMinLength || "1", 10);
+        input.type = "search";
+        input.placeholder = "Search...";
+        results.className = "autocomplete-results";
+        select.parentNode.insertBefore(input, select);
+        select.parentNode.insertBefore(results, select);
+
+        function choose(item) {
+            var option = Array.prototype.find.call(select.options, function (option) {
+                return option.value === String(item.id);
+            });
+            if (!option) {
+                option = new Option(item.name, item.id);
+                select.add(option);
+            }
+            option.selected = true;
+            results.innerHTML = "";
+            input.value = "";
+        }
+
+        function search() {
+            var query = input.value.trim();
+            results.innerHTML = "";
+            if (query.length < minLength) {
+                return;
+            }
+            var url = select.dataset.autocompleteUrl + "?q=" + encodeURIComponent(query);
+            fetch(url, { headers: { Accept: "application/json" } })
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    data.results.forEach(function (item) {
+                        var li = document.createElement("li");
+                        li.textContent = item.name;
+                        li.addEventListener("click", function () { choose(item); });
+                        results.appendChild(li);
+                    });
+                });
+        }
+
+        input.addEventListener("input", function () {
+            clearTimeout(timer);
+            timer = setTimeout(search, 200);
+        });
+    });
+});
@@ -0,0 +1,109 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from book.forms import BookForm
+from book.models import Author, Book, Category
+
+
+@pytest.fixture()
+def setup_book_objects():
+    Author.objects.bulk_create([Author(name=f'Author{i:03}') for i in range(300)])
+    Author.objects.create(name='サン・テグジュペリ')
+    Author.objects.create(name='池澤夏樹')
+    Category.objects.create(name='Novel')
+    Category.objects.create(name='Non-fiction')
+    book = Book.objects.create(title='星の王子様', published_date='2006-03-28')
+    book.authors.add(*Author.objects.filter(name__in=['サン・テグジュペリ', '池澤夏樹']))
+    book.categories.add(Category.objects.get(name='Novel'))
+    return book
+
+
+# 前方一致の候補を優先して返すことをテスト
+def test_author_autocomplete(setup_book_objects, client):
+    data = client.get(reverse('book:author autocomplete'), {'q': 'テグジュ'}).json()
+    assert [item['name'] for item in data['results']] == ['サン・テグジュペリ']
+    data = client.get(
+        reverse('book:author autocomplete'), {'q': 'author01', 'limit': 3}).json()
+    assert [item['name'] for item in data['results']] == [
+        'Author010', 'Author011', 'Author012']
+    assert client.get(reverse('book:author autocomplete')).json() == {'results': []}
+
+
+def test_category_autocomplete(setup_book_objects, client):
+    data = client.get(reverse('book:category autocomplete'), {'q': 'no'}).json()
+    assert [item['name'] for item in data['results']] == ['Novel', 'Non-fiction']
+    assert data['results'][0]['id'] == Category.objects.get(name='Novel').id
+
+
+# 1文字の入力では全件が候補になるので、検索せずに空の結果を返すことをテスト
+@pytest.mark.parametrize('q', ['', ' ', 'A', 'ａ'])
+def test_autocomplete_min_length(setup_book_objects, client, django_assert_num_queries, q):
+    # ETag用のバージョンの取得だけ
+    with django_assert_num_queries(1):
+        data = client.get(reverse('book:author autocomplete'), {'q': q}).json()
+    assert data == {'results': []}
+
+
+# PostgreSQLでは3文字未満の入力は前方一致だけで、3文字以上は部分一致で関連度順に返すことをテスト
+@pytest.mark.postgresql
+@pytest.mark.parametrize('url_name, q, expected', [
+    ('book:category autocomplete', 'no', ['Novel', 'Non-fiction']),
+    ('book:author autocomplete', 'サン', ['サン・テグジュペリ']),
+    ('book:author autocomplete', '池澤', ['池澤夏樹']),
+    ('book:author autocomplete', 'テグ', []),
+    ('book:author autocomplete', 'テグジュ', ['サン・テグジュペリ']),
+    ('book:author autocomplete', 'author01', [f'Author01{i}' for i in range(3)]),
+])
+def test_autocomplete_postgresql(setup_book_objects, client, url_name, q, expected):
+    data = client.get(reverse(url_name), {'q': q, 'limit': 3}).json()
+    assert [item['name'] for item in data['results']] == expected
+
+
+# 編集画面では選択済みの著者・カテゴリーだけを出力することをテスト
+def test_book_edit_renders_selected_only(setup_book_objects, client,
+                                         django_assert_max_num_queries):
+    book = setup_book_objects
+    # 本・選択済みの関連（id）・選択済みの関連（名前）の取得だけ
+    with django_assert_max_num_queries(5):
+        response = client.get(reverse('book:book edit', kwargs={'id': book.id}))
+    content = response.content.decode()
+    assert content.count('<option') == 3
+    assert 'サン・テグジュペリ' in content
+    assert 'Author000' not in content
+    assert reverse('book:author autocomplete') in content
+    assert 'data-autocomplete-min-length="2"' in content
+    assert 'book/autocomplete.js' in content
+
+
+def test_book_register_renders_no_choices(setup_book_objects, client):
+    content = client.get(reverse('book:book register')).content.decode()
+    assert '<option' not in content
+
+
+# 送信されたidだけを確認し、全件を読み込まないことをテスト
+def test_book_form_validates_submitted_ids(setup_book_objects):
+    author = Author.objects.get(name='Author100')
+    category = Category.objects.get(name='Novel')
+    form = BookForm({
+        'title': '夜間飛行',
+        'published_date': '1931-01-01',
+        'categories': [category.id],
+        'authors': [author.id],
+    })
+    with CaptureQueriesContext(connection) as queries:
+        assert form.is_valid()
+    author_queries = [
+        query['sql'] for query in queries.captured_queries
+        if 'FROM "book_author"' in query['sql']
+    ]
+    assert author_queries and all('IN' in sql for sql in author_queries)
+
+    form = BookForm({
+        'title': '夜間飛行',
+        'published_date': '1931-01-01',
+        'categories': [category.id],
+        'authors': [999999],
+    })
+    assert not form.is_valid()
+    assert 'authors' in form.errors
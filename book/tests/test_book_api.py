@@ -0,0 +1,165 @@
+import json
+
+import pytest
+from book.exporter import iter_serialized_chunks, stream_json_array
+from book.models import Author, Book, Category
+from book.serializers import BOOK_FIELDS, BookSerializer, serialize_book_rows
+
+
+@pytest.fixture()
+def setup_book_objects():
+    Category.objects.bulk_create([
+        Category(name='Novel'),
+        Category(name='Design')
+    ])
+    Author.objects.bulk_create([
+        Author(name='サン・テグジュペリ'),
+        Author(name='池澤夏樹')
+    ])
+    c1 = Category.objects.get(name='Novel')
+    a1 = Author.objects.get(name='サン・テグジュペリ')
+    a2 = Author.objects.get(name='池澤夏樹')
+    b1 = Book(title='星の王子様',
+              published_date='2006-03-28')
+    b1.save()
+    b1.categories.add(c1)
+    b1.authors.add(a1, a2)
+    b2 = Book(title='人間の大地', published_date='2015-08-20')
+    b2.save()
+    b2.categories.add(c1)
+    b2.authors.add(a1)
+    Book(title='夜間飛行', published_date='1931-01-01').save()
+
+
+# 高速な一覧用の変換がBookSerializerと同じ結果になることをテスト
+def test_serialize_book_rows_matches_serializer(setup_book_objects):
+    books = Book.objects.order_by('id')
+    expected = [dict(data) for data in BookSerializer(books, many=True).data]
+    for data in expected:
+        data['categories'] = [dict(item) for item in data['categories']]
+        data['authors'] = [dict(item) for item in data['authors']]
+    assert serialize_book_rows(list(books.values(*BOOK_FIELDS))) == expected
+
+
+@pytest.mark.parametrize('url', ['/api/books/{id}', '/books/{id}/'])
+def test_book_detail(setup_book_objects, client, url):
+    book = Book.objects.get(title='星の王子様')
+    data = client.get(url.format(id=book.id)).json()
+    assert data == {
+        'id': book.id,
+        'title': '星の王子様',
+        'published_date': '2006-03-28',
+        'categories': [{'id': book.categories.get().id, 'name': 'Novel'}],
+        'authors': [
+            {'id': author.id, 'name': author.name}
+            for author in book.authors.order_by('id')
+        ],
+    }
+
+
+@pytest.mark.parametrize('url', ['/api/books/999', '/books/999/'])
+def test_book_detail_not_found(client, url):
+    assert client.get(url).status_code == 404
+
+
+# 数字以外のidでも500にならず404になることをテスト
+def test_book_detail_invalid_id(client):
+    assert client.get('/books/abc/').status_code == 404
+
+
+# ?fields= で指定したフィールドだけを返し、関連のクエリを発行しないことをテスト
+@pytest.mark.parametrize('url', ['/api/books', '/books/'])
+def test_book_list_fields(setup_book_objects, client, url,
+                          django_assert_max_num_queries):
+    with django_assert_max_num_queries(2):
+        data = client.get(url, {'fields': 'id,title'}).json()
+    assert data['results'] == [
+        {'id': book.id, 'title': book.title} for book in Book.objects.order_by('id')
+    ]
+
+
+# ?expand= で指定した関連だけを追加で返すことをテスト
+@pytest.mark.parametrize('url', ['/api/books', '/books/'])
+def test_book_list_expand(setup_book_objects, client, url):
+    data = client.get(url, {'fields': 'title', 'expand': 'authors'}).json()
+    book = data['results'][0]
+    assert set(book) == {'title', 'authors'}
+    assert [author['name'] for author in book['authors']] == [
+        'サン・テグジュペリ', '池澤夏樹']
+    data = client.get(url, {'expand': 'categories'}).json()
+    assert set(data['results'][0]) == {'id', 'title', 'published_date', 'categories'}
+
+
+# 並び替えのキーをフィールドに含めなくても次のページを取得できることをテスト
+def test_book_list_fields_with_ordering(setup_book_objects, client):
+    data = client.get('/api/books', {
+        'fields': 'title', 'ordering': 'published_date', 'page_size': 2}).json()
+    assert [book['title'] for book in data['results']] == ['夜間飛行', '星の王子様']
+    data = client.get(data['next']).json()
+    assert data['results'] == [{'title': '人間の大地'}]
+
+
+@pytest.mark.parametrize('url', ['/api/books/{id}', '/books/{id}/'])
+def test_book_detail_fields(setup_book_objects, client, url):
+    book = Book.objects.get(title='星の王子様')
+    data = client.get(url.format(id=book.id), {
+        'fields': 'id,published_date', 'expand': 'categories'}).json()
+    assert data == {
+        'id': book.id,
+        'published_date': '2006-03-28',
+        'categories': [{'id': book.categories.get().id, 'name': 'Novel'}],
+    }
+
+
+@pytest.mark.parametrize('params', [{'fields': 'isbn'}, {'expand': 'title'}])
+@pytest.mark.parametrize('url', ['/api/books', '/books/'])
+def test_book_list_unknown_fields(client, url, params):
+    assert client.get(url, params).status_code == 400
+
+
+def streamed(response):
+    assert response.streaming
+    return b''.join(response.streaming_content).decode('utf-8')
+
+
+# ?stream=1 で全件をJSON配列としてストリーミングで返すことをテスト
+@pytest.mark.parametrize('url, params, title', [
+    ('/api/books', {'title': '間'}, '間'),
+    ('/books/', {}, ''),
+])
+def test_book_list_stream(setup_book_objects, client, url, params, title):
+    response = client.get(url, dict(params, stream='1'))
+    assert response['Content-Type'] == 'application/json'
+    books = Book.objects.filter(title__contains=title).order_by('id')
+    assert json.loads(streamed(response)) == serialize_book_rows(
+        list(books.values(*BOOK_FIELDS)))
+
+
+# ブラウザ用のHTMLではストリーミングできないので406を返すことをテスト
+@pytest.mark.parametrize('url', ['/api/books', '/books/'])
+def test_book_list_stream_html(setup_book_objects, client, url):
+    response = client.get(url, {'stream': '1', 'format': 'api'})
+    assert response.status_code == 406
+
+
+# Accept: application/x-ndjson の場合は1行1冊で返すことをテスト
+@pytest.mark.parametrize('url', ['/api/books', '/books/'])
+def test_book_list_stream_ndjson(setup_book_objects, client, url):
+    response = client.get(
+        url, {'fields': 'title'}, HTTP_ACCEPT='application/x-ndjson')
+    assert response['Content-Type'] == 'application/x-ndjson'
+    assert streamed(response).splitlines() == [
+        json.dumps({'title': title}, ensure_ascii=False)
+        for title in Book.objects.order_by('id').values_list('title', flat=True)
+    ]
+
+
+# チャンクごとに少しずつ返し、最初のデータはクエリ無しで返すことをテスト
+def test_stream_json_array_chunks(setup_book_objects, django_assert_num_queries):
+    stream = stream_json_array(iter_serialized_chunks(chunk_size=2))
+    with django_assert_num_queries(0):
+        assert next(stream) == '['
+    parts = list(stream)
+    assert len(parts) == 3
+    assert [book['title'] for book in json.loads('[' + ''.join(parts))] == [
+        '星の王子様', '人間の大地', '夜間飛行']
@@ -0,0 +1,196 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from book.models import Author, Book, Category, book_fingerprint
+from book.views import BULK_LIMIT
+
+
+def book_payload(title, authors=('池澤夏樹',), categories=('Novel',), **kwargs):
+    return dict(
+        title=title,
+        published_date='2006-03-28',
+        authors=[{'name': name} for name in authors],
+        categories=[{'name': name} for name in categories],
+        **kwargs,
+    )
+
+
+# JSON配列でまとめて登録できることをテスト
+def test_bulk_create(client):
+    payload = [
+        book_payload('星の王子様', authors=('サン・テグジュペリ', '池澤夏樹')),
+        book_payload('人間の大地', authors=('サン・テグジュペリ',)),
+    ]
+    response = client.post(
+        '/api/books/bulk', json.dumps(payload), content_type='application/json')
+    assert response.status_code == 201
+    results = response.json()['results']
+    assert [book['title'] for book in results] == ['星の王子様', '人間の大地']
+    assert Book.objects.count() == 2
+    assert Author.objects.count() == 2
+    assert Category.objects.count() == 1
+    book = Book.objects.get(title='星の王子様')
+    assert book.fingerprint == book_fingerprint(
+        '星の王子様', ['サン・テグジュペリ', '池澤夏樹'])
+    assert set(book.authors.values_list('name', flat=True)) == {
+        'サン・テグジュペリ', '池澤夏樹'}
+
+
+# NDJSONでまとめて登録できることをテスト
+def test_bulk_create_ndjson(client):
+    body = '\n'.join(json.dumps(book_payload(f'本{i}')) for i in range(3)) + '\n'
+    response = client.post(
+        '/api/books/bulk', body, content_type='application/x-ndjson')
+    assert response.status_code == 201
+    assert [book['title'] for book in response.json()['results']] == [
+        '本0', '本1', '本2']
+    assert Book.objects.count() == 3
+
+
+# idを指定した場合は既存の本を更新し、入力順で結果を返すことをテスト
+def test_bulk_update(client):
+    book = Book.objects.create(title='夜間飛行', published_date='1931-01-01')
+    book.authors.add(Author.objects.create(name='堀口大學'))
+    payload = [
+        book_payload('南方郵便機'),
+        book_payload('夜間飛行', authors=('サン・テグジュペリ',), id=book.id),
+    ]
+    response = client.post(
+        '/api/books/bulk', json.dumps(payload), content_type='application/json')
+    assert response.status_code == 201
+    results = response.json()['results']
+    assert [result['title'] for result in results] == ['南方郵便機', '夜間飛行']
+    assert results[1]['id'] == book.id
+    book.refresh_from_db()
+    assert list(book.authors.values_list('name', flat=True)) == ['サン・テグジュペリ']
+    assert book.fingerprint == book_fingerprint('夜間飛行', ['サン・テグジュペリ'])
+
+
+# 更新時は中間テーブルの差分だけを削除・追加することをテスト
+def test_bulk_update_writes_relation_diff(client):
+    book = Book.objects.create(title='夜間飛行', published_date='1931-01-01')
+    book.authors.add(
+        Author.objects.create(name='サン・テグジュペリ'),
+        Author.objects.create(name='堀口大學'))
+    book.categories.add(Category.objects.create(name='Novel'))
+    kept = Book.authors.through.objects.get(
+        book=book, author__name='サン・テグジュペリ').pk
+    category_link = Book.categories.through.objects.get(book=book).pk
+
+    payload = [book_payload(
+        '夜間飛行', authors=('サン・テグジュペリ', '二木麻里'), id=book.id)]
+    response = client.post(
+        '/api/books/bulk', json.dumps(payload), content_type='application/json')
+    assert response.status_code == 201
+    links = Book.authors.through.objects.filter(book=book)
+    assert sorted(links.values_list('author__name', flat=True)) == [
+        'サン・テグジュペリ', '二木麻里']
+    assert links.get(author__name='サン・テグジュペリ').pk == kept
+    assert Book.categories.through.objects.get(book=book).pk == category_link
+
+    # 関連が変わらなければ中間テーブルには書き込まない
+    with CaptureQueriesContext(connection) as queries:
+        client.post(
+            '/api/books/bulk', json.dumps(payload),
+            content_type='application/json')
+    through_tables = (Book.authors.through._meta.db_table,
+                      Book.categories.through._meta.db_table)
+    assert not [
+        query['sql'] for query in queries.captured_queries
+        if query['sql'].startswith(('INSERT', 'DELETE'))
+        and any(table in query['sql'] for table in through_tables)
+    ]
+
+
+# エラーは1回のレスポンスでまとめて返し、何も登録しないことをテスト
+def test_bulk_errors(client):
+    client.post(
+        '/api/books/bulk', json.dumps([book_payload('星の王子様')]),
+        content_type='application/json')
+    payload = [
+        book_payload('人間の大地'),
+        book_payload('星の王子様'),
+        book_payload(''),
+        book_payload('夜間飛行', id=999),
+        book_payload('人間の大地'),
+    ]
+    response = client.post(
+        '/api/books/bulk', json.dumps(payload), content_type='application/json')
+    assert response.status_code == 400
+    errors = response.json()['errors']
+    assert [error['index'] for error in errors] == [1, 2, 3, 4]
+    assert errors[0]['errors'] == {
+        'non_field_errors': ['Book with the same title and authors already exists']}
+    assert set(errors[1]['errors']) == {'title'}
+    assert errors[2]['errors'] == {'id': ['The book does not exist']}
+    assert Book.objects.count() == 1
+
+
+# 同じidが2回含まれる場合は、2件目をエラーにして何も更新しないことをテスト
+def test_bulk_duplicate_id(client):
+    book = Book.objects.create(title='夜間飛行', published_date='1931-01-01')
+    payload = [
+        book_payload('夜間飛行', id=book.id),
+        book_payload('南方郵便機'),
+        book_payload('人間の大地', id=book.id),
+    ]
+    response = client.post(
+        '/api/books/bulk', json.dumps(payload), content_type='application/json')
+    assert response.status_code == 400
+    assert response.json()['errors'] == [
+        {'index': 2, 'errors': {'id': ['The book is given more than once']}}]
+    assert list(Book.objects.values_list('title', flat=True)) == ['夜間飛行']
+    assert not book.authors.exists()
+
+
+@pytest.mark.parametrize('body, content_type', [
+    ('{"title": "星の王子様"}', 'application/json'),
+    ('[{"title": ', 'application/json'),
+    ('{"title": \n', 'application/x-ndjson'),
+])
+def test_bulk_bad_request(client, body, content_type):
+    response = client.post('/api/books/bulk', body, content_type=content_type)
+    assert response.status_code == 400
+
+
+# NDJSONは上限の件数を超えた時点で読むのをやめることをテスト
+def test_bulk_ndjson_limit(client):
+    lines = [json.dumps(book_payload(f'本{i}')) for i in range(BULK_LIMIT + 1)]
+    # 上限を超えた後の行は読まれないので、壊れていてもエラーにならない
+    body = '\n'.join(lines + ['{"title": ']) + '\n'
+    response = client.post(
+        '/api/books/bulk', body, content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert response.json()['message'] == f'Too many books. The limit is {BULK_LIMIT}'
+    assert Book.objects.count() == 0
+
+
+# リクエストの本文が大きすぎる場合は読まずに413を返すことをテスト
+@pytest.mark.parametrize('content_type', ['application/json', 'application/x-ndjson'])
+def test_bulk_body_too_large(client, monkeypatch, content_type):
+    monkeypatch.setattr('book.views.BULK_MAX_BYTES', 100)
+    response = client.post(
+        '/api/books/bulk', json.dumps([book_payload('星の王子様')] * 2),
+        content_type=content_type)
+    assert response.status_code == 413
+    assert Book.objects.count() == 0
+
+
+# 件数が増えてもクエリ数が増えないことをテスト
+def test_bulk_query_count(client):
+    def post(count, offset):
+        payload = [
+            book_payload(f'本{i}', authors=(f'著者{i}',), categories=(f'分類{offset}',))
+            for i in range(offset, offset + count)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(
+                '/api/books/bulk', json.dumps(payload),
+                content_type='application/json')
+        assert response.status_code == 201
+        return len(queries)
+
+    post(1, 0)
+    assert post(50, 100) == post(5, 200)
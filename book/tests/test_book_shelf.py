@@ -0,0 +1,83 @@
+import pytest
+from django.urls import reverse
+from book.models import Author, Book, Category
+from book.pagination import KeysetPagination
+
+
+@pytest.fixture()
+def setup_book_objects():
+    novel = Category.objects.create(name='Novel')
+    design = Category.objects.create(name='Design')
+    a1 = Author.objects.create(name='サン・テグジュペリ')
+    a2 = Author.objects.create(name='池澤夏樹')
+    for title, categories, authors in [
+        ('星の王子様', [novel], [a1, a2]),
+        ('人間の大地', [novel], [a1]),
+        ('夜間飛行', [novel, design], [a1]),
+        ('デザインの本', [design], []),
+    ]:
+        book = Book.objects.create(title=title, published_date='2006-03-28')
+        book.categories.add(*categories)
+        book.authors.add(*authors)
+
+
+def titles(response):
+    return [book.title for book in response.context['books']]
+
+
+# 次へ・前へのリンクで全ての本を順番に表示できることをテスト
+def test_book_shelf_pagination(setup_book_objects, client):
+    response = client.get(reverse('book:book shelf'), {'page_size': 3})
+    assert titles(response) == ['星の王子様', '人間の大地', '夜間飛行']
+    assert response.context['previous_url'] is None
+    response = client.get(response.context['next_url'])
+    assert titles(response) == ['デザインの本']
+    assert response.context['next_url'] is None
+    response = client.get(response.context['previous_url'])
+    assert titles(response) == ['星の王子様', '人間の大地', '夜間飛行']
+
+
+@pytest.mark.parametrize('params, expected', [
+    ({'title': '間'}, ['人間の大地', '夜間飛行']),
+    ({'author': '池澤'}, ['星の王子様']),
+    ({'author': 'テグジュペリ', 'category': 'design'}, ['夜間飛行']),
+    ({'category': 'Design'}, ['夜間飛行', 'デザインの本']),
+])
+def test_book_shelf_filters(setup_book_objects, client, params, expected):
+    response = client.get(reverse('book:book shelf'), params)
+    assert titles(response) == expected
+
+
+def test_book_shelf_links(setup_book_objects, client):
+    book = Book.objects.get(title='星の王子様')
+    content = client.get(reverse('book:book shelf')).content.decode()
+    for name in ['book:book edit', 'book:book detail', 'book:book delete']:
+        assert f'href="{reverse(name, kwargs={"id": book.id})}"' in content
+
+
+def test_book_shelf_invalid_cursor(client):
+    response = client.get(reverse('book:book shelf'), {'cursor': 'invalid'})
+    assert response.status_code == 404
+
+
+# 形式は正しいがキーの型が合わないカーソルでも404になることをテスト
+@pytest.mark.parametrize('params', [
+    {'cursor': KeysetPagination().encode_cursor(['abc'], False)},
+    {'cursor': KeysetPagination().encode_cursor(['abc', 1], False),
+     'ordering': 'published_date'},
+])
+def test_book_shelf_malformed_cursor(setup_book_objects, client, params):
+    response = client.get(reverse('book:book shelf'), params)
+    assert response.status_code == 404
+
+
+# 本の件数に関係なく、1ページの表示にかかるクエリ数が変わらないことをテスト
+@pytest.mark.parametrize('size', [10, 200])
+def test_book_shelf_query_count(client, django_assert_max_num_queries, size):
+    Book.objects.bulk_create([
+        Book(title=f'Title{i}', published_date='2006-03-28', fingerprint=str(i))
+        for i in range(size)
+    ])
+    with django_assert_max_num_queries(1):
+        response = client.get(reverse('book:book shelf'))
+    assert len(response.context['books']) == min(size, 50)
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+from book.models import Author, Book, Category
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+
+@pytest.fixture()
+def setup_book_objects():
+    category = Category.objects.create(name='Novel')
+    author = Author.objects.create(name='サン・テグジュペリ')
+    book = Book.objects.create(title='星の王子様', published_date='2006-03-28')
+    book.categories.add(category)
+    book.authors.add(author)
+    return book
+
+
+def etag_changed(client, url, write):
+    etag = client.get(url)['ETag']
+    write()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    return response.status_code == 200 and response['ETag'] != etag
+
+
+# 変更が無ければテーブルを読まずに304を返すことをテスト
+@pytest.mark.parametrize('url', [
+    '/api/books', '/api/books/{id}', '/books/', '/books/{id}/',
+    '/api/authors', '/authors/', '/api/categories', '/categories/',
+])
+def test_not_modified(setup_book_objects, client, django_assert_num_queries, url):
+    url = url.format(id=setup_book_objects.id)
+    response = client.get(url)
+    assert response.status_code == 200
+    with django_assert_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 304
+
+
+def test_etag_changes_on_api_write(setup_book_objects, client):
+    assert etag_changed(client, '/api/books', lambda: client.post(
+        '/api/books', json.dumps({
+            'title': '人間の大地', 'published_date': '2015-08-20',
+            'categories': [{'name': 'Novel'}],
+            'authors': [{'name': 'サン・テグジュペリ'}]}),
+        content_type='application/json'))
+
+
+# 更新で新しい著者・カテゴリーが作られた場合も一覧のETagが変わることをテスト
+@pytest.mark.parametrize('url, field, name', [
+    ('/api/authors', 'authors', '池澤夏樹'),
+    ('/api/categories', 'categories', 'Design'),
+])
+def test_etag_changes_on_new_related_name(setup_book_objects, client, url, field, name):
+    data = {
+        'title': '星の王子様', 'published_date': '2006-03-28',
+        'categories': [{'name': 'Novel'}],
+        'authors': [{'name': 'サン・テグジュペリ'}],
+    }
+    data[field] = data[field] + [{'name': name}]
+    etag = client.get(url)['ETag']
+    client.put(f'/api/books/{setup_book_objects.id}', json.dumps(data),
+               content_type='application/json')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert name in [item['name'] for item in response.json()['results']]
+
+
+def test_etag_changes_on_form_write(setup_book_objects, client):
+    author = Author.objects.get()
+    assert etag_changed(client, '/api/authors', lambda: client.post(
+        f'/author-edit/{author.id}', {'name': '池澤夏樹'}))
+    # 著者名の変更は本のレスポンスにも含まれる
+    assert etag_changed(client, '/api/books', lambda: client.post(
+        f'/author-edit/{author.id}', {'name': 'サン・テグジュペリ'}))
+
+
+def test_etag_changes_on_admin_write(setup_book_objects, admin_client):
+    assert etag_changed(admin_client, '/api/categories', lambda: admin_client.post(
+        '/admin/book/category/add/', {'name': 'Design'}))
+
+
+def test_etag_changes_on_csv_import(setup_book_objects, client):
+    import_file = SimpleUploadedFile('books.csv', bytes(
+        'Title,Published Date,Author,Category\nTitle1,2006-03-28,Author1,Category1\n',
+        encoding='utf-8'))
+    assert etag_changed(client, '/books/', lambda: client.post(
+        '/book-register/', {'csv-import': 'True', 'csv': import_file}))
+
+
+def test_etag_unchanged_for_other_resource(setup_book_objects, client):
+    assert not etag_changed(client, '/api/categories', lambda: client.post(
+        '/author-register/', {'name': '池澤夏樹'}))
+
+
+# 存在しない本の404にはETagを付けない（再検証で304にならない）ことをテスト
+@pytest.mark.parametrize('url', ['/api/books/{id}', '/books/{id}/'])
+def test_no_etag_for_error_response(setup_book_objects, client, url):
+    url = url.format(id=setup_book_objects.id + 1)
+    response = client.get(url)
+    assert response.status_code == 404
+    assert 'ETag' not in response
+
+
+# ブラウザ向けのHTMLとJSONでETagが異なることをテスト
+@pytest.mark.parametrize('url, extra', [
+    ('/api/books', {'HTTP_ACCEPT': 'text/html'}),
+    ('/api/books?format=api', {}),
+])
+def test_etag_differs_for_html(setup_book_objects, client, url, extra):
+    html = client.get(url, **extra)
+    assert html['Content-Type'].startswith('text/html')
+    json_response = client.get('/api/books', HTTP_ACCEPT='application/json')
+    assert html['ETag'] != json_response['ETag']
+    response = client.get('/api/books', HTTP_IF_NONE_MATCH=html['ETag'])
+    assert response.status_code == 200
@@ -1,8 +1,14 @@
 import csv
+import gzip
 import io
+import json
+import threading
 
 import pytest
+from book import exporter
+from book.exporter import iter_aggregated_rows, iter_export_rows, stream_csv
 from book.models import Author, Book, Category
+from django.core.management import call_command
 
 
 @pytest.fixture()
@@ -31,7 +37,7 @@ def setup_book_objects():
 
 def test_csv_export(setup_book_objects, client):
     response = client.post('/book-shelf/', {'csv-export': 'True'})
-    content = response.content.decode('utf-8')
+    content = b''.join(response.streaming_content).decode('utf-8')
     cvs_reader = csv.reader(io.StringIO(content))
     download_data = list(cvs_reader)
     header = download_data.pop(0)
@@ -43,3 +49,123 @@ def test_csv_export(setup_book_objects, client):
     ]
     assert header == expected_header
     assert download_data == expected_data
+
+
+# 複数のチャンクに分けて出力しても番号と並び順が変わらないことをテスト
+def test_csv_export_in_chunks(setup_book_objects):
+    content = ''.join(stream_csv(iter_export_rows(chunk_size=1)))
+    download_data = list(csv.reader(io.StringIO(content)))
+    assert download_data == [
+        ['No.', 'Title', 'Published Date', 'Author', 'Category'],
+        ['1', '星の王子様', '2006-03-28', 'サン・テグジュペリ, 池澤夏樹', 'Novel'],
+        ['2', '人間の大地', '2015-08-20', 'サン・テグジュペリ', 'Novel']
+    ]
+
+
+# DB側で集計した場合も同じ内容が1回のクエリで出力されることをテスト
+def test_csv_export_aggregated(setup_book_objects, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        content = ''.join(stream_csv(iter_aggregated_rows()))
+    download_data = list(csv.reader(io.StringIO(content)))
+    assert download_data == [
+        ['No.', 'Title', 'Published Date', 'Author', 'Category'],
+        ['1', '星の王子様', '2006-03-28', 'サン・テグジュペリ, 池澤夏樹', 'Novel'],
+        ['2', '人間の大地', '2015-08-20', 'サン・テグジュペリ', 'Novel']
+    ]
+
+
+# 変更が無ければ同じファイルを返し、ETagが一致すれば304を返すことをテスト
+def test_csv_export_snapshot(setup_book_objects, client, django_assert_num_queries):
+    response = client.get('/book-export/')
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert b''.join(response.streaming_content).decode('utf-8').count('\n') == 3
+
+    with django_assert_num_queries(1):
+        response = client.get('/book-export/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    Book.objects.get(title='人間の大地').authors.add(
+        Author.objects.get(name='池澤夏樹'))
+    response = client.get('/book-export/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    download_data = list(csv.reader(io.StringIO(
+        b''.join(response.streaming_content).decode('utf-8'))))
+    assert download_data[2] == [
+        '2', '人間の大地', '2015-08-20', 'サン・テグジュペリ, 池澤夏樹', 'Novel']
+
+
+# 同じプロセスの複数のスレッドが同時にスナップショットを作っても、どれも同じファイルを返すことをテスト
+def test_concurrent_export_snapshot(settings, tmp_path, monkeypatch):
+    settings.BOOK_EXPORT_DIR = tmp_path
+    barrier = threading.Barrier(2, timeout=5)
+
+    def slow_stream_csv(rows):
+        barrier.wait()
+        yield 'No.,Title\r\n'
+
+    monkeypatch.setattr(exporter, 'stream_csv', slow_stream_csv)
+    monkeypatch.setattr(exporter, 'iter_aggregated_rows', lambda: [])
+    results, errors = [], []
+
+    def export():
+        try:
+            results.append(exporter.export_snapshot(version='v1'))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=export) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert results == [tmp_path / 'book_detail_v1.csv'] * 2
+    assert results[0].read_bytes() == b'No.,Title\r\n'
+    assert [p.name for p in tmp_path.iterdir()] == ['book_detail_v1.csv']
+
+
+# gzip圧縮したCSVが同じ内容で出力されることをテスト
+def test_csv_gzip_export(setup_book_objects, client):
+    response = client.get('/book-export/', {'format': 'csv.gz'})
+    assert response['Content-Type'] == 'application/gzip'
+    content = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+    download_data = list(csv.reader(io.StringIO(content)))
+    assert download_data[1] == [
+        '1', '星の王子様', '2006-03-28', 'サン・テグジュペリ, 池澤夏樹', 'Novel']
+
+
+# NDJSONがBookSerializerと同じ形式で1行1冊出力されることをテスト
+def test_ndjson_export(setup_book_objects, client):
+    response = client.post('/book-shelf/', {'csv-export': 'True', 'format': 'ndjson'})
+    assert response['Content-Type'] == 'application/x-ndjson'
+    lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+    books = [json.loads(line) for line in lines]
+    assert [book['title'] for book in books] == ['星の王子様', '人間の大地']
+    assert books[0]['published_date'] == '2006-03-28'
+    assert [author['name'] for author in books[0]['authors']] == [
+        'サン・テグジュペリ', '池澤夏樹']
+    assert [category['name'] for category in books[1]['categories']] == ['Novel']
+
+
+def test_unknown_export_format(client):
+    response = client.get('/book-export/', {'format': 'xml'})
+    assert response.status_code == 400
+
+
+# idの範囲で分割して出力しても、画面からの出力と同じ内容になることをテスト
+@pytest.mark.parametrize('partitions', [1, 2, 3, 5])
+def test_partitioned_export(setup_book_objects, client, tmp_path, partitions):
+    Book.objects.create(title='夜間飛行', published_date='1931-01-01')
+    Book.objects.create(title='南方郵便機', published_date='1929-01-01')
+    expected = b''.join(
+        client.post('/book-shelf/', {'csv-export': 'True'}).streaming_content
+    ).decode('utf-8')
+
+    out = io.StringIO()
+    call_command('export_books', str(tmp_path / 'books.csv'), '--workers', '1',
+                 '--partitions', str(partitions), stdout=out)
+    assert 'Exported 4 books' in out.getvalue()
+    assert (tmp_path / 'books.csv').read_bytes().decode('utf-8') == expected
+    assert list(tmp_path.glob('.books.csv.part*')) == []
@@ -1,6 +1,11 @@
+import csv
+
 import pytest
-from book.models import Author, Book, Category
+from book.importer import BookImporter
+from book.models import Author, Book, Category, TableVersion
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
 @pytest.fixture()
@@ -186,3 +191,77 @@ def test_multiple_error_csv_import(setup_book_objects, client):
         assert sorted(expected_error_list) == sorted(error_list)
         expected_book_list = ['星の王子様', '人間の大地']
         assert sorted(expected_book_list) == sorted(book_list)
+
+
+def post_generated_csv(client, row_count):
+    lines = ["Title,Published Date,Author,Category"]
+    for i in range(row_count):
+        lines.append(f'Title{i},2006-03-28,"Author{i % 7},Author{i % 5}",Category{i % 3}')
+    import_file = SimpleUploadedFile(
+        'generated.csv', bytes("\n".join(lines), encoding='utf-8'))
+    with CaptureQueriesContext(connection) as context:
+        client.post('/book-register/', {'csv-import': 'True', 'csv': import_file})
+    return len(context.captured_queries)
+
+
+# 行数が増えてもクエリ数が変わらないことをテスト
+# bulk_createで主キーが返らないDBの場合も確認する
+@pytest.mark.parametrize('returns_pks', [True, False])
+def test_csv_import_query_count_is_constant(client, monkeypatch, returns_pks):
+    if not returns_pks:
+        monkeypatch.setattr('book.importer.can_return_pks', lambda: False)
+    post_generated_csv(client, 1)
+    Book.objects.all().delete()
+    Author.objects.all().delete()
+    Category.objects.all().delete()
+    small = post_generated_csv(client, 10)
+    Book.objects.all().delete()
+    Author.objects.all().delete()
+    Category.objects.all().delete()
+    large = post_generated_csv(client, 200)
+    assert small == large
+    assert Book.objects.count() == 200
+    assert Book.objects.get(title='Title12').authors.count() == 2
+
+
+def read_csv_lines(path):
+    with open(path, encoding='utf-8') as f:
+        lines = list(csv.reader(f))
+    return lines[1:]
+
+
+# バッチ単位の取り込みでも全件が登録されることをテスト
+def test_stream_csv_import():
+    report = BookImporter(batch_size=2).stream(
+        read_csv_lines("testFiles/book_upload_file_regular_test.csv"))
+    assert report.errors == []
+    assert report.imported == 3
+    assert sorted(Book.objects.values_list('title', flat=True)) == [
+        'Title1', 'Title2', 'Title3']
+
+
+# バッチをまたいだ重複やエラーがあった場合に、登録済みのバッチも取り消されることをテスト
+def test_stream_csv_import_rolls_back_on_error(setup_book_objects):
+    lines = read_csv_lines("testFiles/book_upload_file_regular_test.csv")
+    lines.append(lines[0])
+    report = BookImporter(batch_size=2).stream(lines)
+    assert report.errors == ["['Title1'] have duplicate title and author"]
+    assert report.imported == 0
+    assert sorted(Book.objects.values_list('title', flat=True)) == [
+        '人間の大地', '星の王子様']
+
+
+# バッチごとにはバージョンを上げず、取り込みの最後に1回だけ上げることをテスト
+def test_stream_csv_import_bumps_versions_once():
+    lines = [
+        [f'Title{i}', '2006-03-28', f'Author{i}', f'Category{i}'] for i in range(5)]
+    with CaptureQueriesContext(connection) as context:
+        report = BookImporter(batch_size=2).stream(lines)
+    assert report.imported == 5
+    table = TableVersion._meta.db_table
+    version_writes = [
+        query['sql'] for query in context.captured_queries
+        if table in query['sql'] and query['sql'].startswith('UPDATE')]
+    assert len(version_writes) == 3
+    assert dict(TableVersion.objects.values_list('name', 'version')) == {
+        'book': 1, 'author': 1, 'category': 1}
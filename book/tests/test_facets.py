@@ -0,0 +1,61 @@
+import pytest
+from book.models import Author, Book, Category
+
+
+@pytest.fixture()
+def setup_book_objects():
+    novel = Category.objects.create(name='Novel')
+    essay = Category.objects.create(name='Essay')
+    a1 = Author.objects.create(name='サン・テグジュペリ')
+    a2 = Author.objects.create(name='池澤夏樹')
+    for title, published_date, categories, authors in [
+        ('星の王子様', '2006-03-28', [novel], [a1, a2]),
+        ('人間の大地', '2015-08-20', [novel, essay], [a1]),
+        ('夜間飛行', '1931-01-01', [novel], [a1]),
+        ('南方郵便機', '1931-06-01', [], []),
+    ]:
+        book = Book.objects.create(title=title, published_date=published_date)
+        book.categories.add(*categories)
+        book.authors.add(*authors)
+
+
+def names(facets):
+    return [(item['name'], item['count']) for item in facets]
+
+
+# カテゴリー・著者・出版年ごとの本の数を返すことをテスト
+def test_book_facets(setup_book_objects, client):
+    data = client.get('/api/books/facets').json()
+    assert names(data['categories']) == [('Novel', 3), ('Essay', 1)]
+    assert names(data['authors']) == [('サン・テグジュペリ', 3), ('池澤夏樹', 1)]
+    assert data['years'] == [
+        {'year': 1931, 'count': 2},
+        {'year': 2006, 'count': 1},
+        {'year': 2015, 'count': 1},
+    ]
+
+
+# book_listと同じ ?title= で絞り込めることをテスト
+def test_book_facets_title_filter(setup_book_objects, client):
+    data = client.get('/api/books/facets', {'title': '間', 'limit': 1}).json()
+    assert names(data['categories']) == [('Novel', 2)]
+    assert names(data['authors']) == [('サン・テグジュペリ', 2)]
+    assert data['years'] == [{'year': 1931, 'count': 1}, {'year': 2015, 'count': 1}]
+
+
+# 集計は1種類につき1クエリで、2回目以降はキャッシュから返すことをテスト
+def test_book_facets_queries(setup_book_objects, client,
+                             django_assert_num_queries):
+    with django_assert_num_queries(4):
+        client.get('/api/books/facets')
+    with django_assert_num_queries(1):
+        client.get('/api/books/facets')
+
+
+# 中間テーブルが変わればキャッシュを使わずに数え直すことをテスト
+def test_book_facets_invalidated(setup_book_objects, client):
+    client.get('/api/books/facets')
+    book = Book.objects.get(title='南方郵便機')
+    book.authors.add(Author.objects.get(name='池澤夏樹'))
+    data = client.get('/api/books/facets').json()
+    assert names(data['authors']) == [('サン・テグジュペリ', 3), ('池澤夏樹', 2)]
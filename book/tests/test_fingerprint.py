@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from book.forms import BookForm
+from book.importer import BookImporter
+from book.models import Author, Book, Category, book_fingerprint
+
+
+@pytest.fixture()
+def setup_book_objects():
+    Category.objects.bulk_create([
+        Category(name='Novel'),
+        Category(name='Design')
+    ])
+    Author.objects.bulk_create([
+        Author(name='サン・テグジュペリ'),
+        Author(name='池澤夏樹')
+    ])
+    c1 = Category.objects.get(name='Novel')
+    a1 = Author.objects.get(name='サン・テグジュペリ')
+    a2 = Author.objects.get(name='池澤夏樹')
+    b1 = Book(title='星の王子様',
+              published_date='2006-03-28')
+    b1.save()
+    b1.categories.add(c1)
+    b1.authors.add(a1, a2)
+    b2 = Book(title='人間の大地', published_date='2015-08-20')
+    b2.save()
+    b2.categories.add(c1)
+    b2.authors.add(a1)
+
+
+# 著者の順番に関係なく同じハッシュになることをテスト
+def test_fingerprint_ignores_author_order():
+    assert book_fingerprint('星の王子様', ['池澤夏樹', 'サン・テグジュペリ']) == \
+        book_fingerprint('星の王子様', ['サン・テグジュペリ', '池澤夏樹'])
+    assert book_fingerprint('星の王子様', ['池澤夏樹']) != \
+        book_fingerprint('星の王子様', ['サン・テグジュペリ', '池澤夏樹'])
+
+
+# 同じ著者が重複していても1人として扱うことをテスト
+def test_fingerprint_ignores_duplicate_authors():
+    assert book_fingerprint('星の王子様', ['池澤夏樹', '池澤夏樹']) == \
+        book_fingerprint('星の王子様', ['池澤夏樹'])
+
+
+# 著者が重複したCSVの行から登録した本も、画面から同じ本として重複判定されることをテスト
+def test_import_with_duplicate_authors_is_detected_by_form():
+    BookImporter().run([['星の王子様', '2006-03-28', '池澤夏樹,池澤夏樹', 'Novel']])
+    book = Book.objects.get(title='星の王子様')
+    assert book.authors.count() == 1
+    form = BookForm(data={
+        'title': '星の王子様',
+        'published_date': '2006-03-28',
+        'categories': [Category.objects.get().id],
+        'authors': [Author.objects.get().id],
+    })
+    assert not form.is_valid()
+
+
+# 著者の追加・削除・名前変更でハッシュが更新されることをテスト
+def test_fingerprint_follows_author_changes(setup_book_objects):
+    book = Book.objects.get(title='人間の大地')
+    a2 = Author.objects.get(name='池澤夏樹')
+    assert book.fingerprint == book_fingerprint('人間の大地', ['サン・テグジュペリ'])
+
+    book.authors.add(a2)
+    book.refresh_from_db()
+    assert book.fingerprint == book_fingerprint(
+        '人間の大地', ['サン・テグジュペリ', '池澤夏樹'])
+
+    a2.name = '東野圭吾'
+    a2.save()
+    book.refresh_from_db()
+    assert book.fingerprint == book_fingerprint(
+        '人間の大地', ['サン・テグジュペリ', '東野圭吾'])
+
+    a2.book_set.remove(book)
+    book.refresh_from_db()
+    assert book.fingerprint == book_fingerprint('人間の大地', ['サン・テグジュペリ'])
+
+
+# APIからもタイトルと著者が一致する本は登録できないことをテスト
+def test_api_rejects_duplicate_book(setup_book_objects, client):
+    book_data = {
+        'title': '星の王子様',
+        'published_date': '2020-01-01',
+        'categories': [{'name': 'Novel'}],
+        'authors': [{'name': '池澤夏樹'}, {'name': 'サン・テグジュペリ'}]
+    }
+    response = client.post('/api/books', json.dumps(book_data),
+                           content_type='application/json')
+    assert response.status_code == 400
+    assert Book.objects.filter(title='星の王子様').count() == 1
+
+    book_data['authors'] = [{'name': '池澤夏樹'}]
+    response = client.post('/api/books', json.dumps(book_data),
+                           content_type='application/json')
+    assert response.status_code == 201
+    assert Book.objects.get(id=response.json()['id']).fingerprint == \
+        book_fingerprint('星の王子様', ['池澤夏樹'])
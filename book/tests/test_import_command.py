@@ -0,0 +1,65 @@
+import csv
+
+import pytest
+from book.importer import CopyBookImporter, get_importer
+from book.models import Author, Book, book_fingerprint
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import StringIO
+
+
+@pytest.fixture()
+def setup_existing_author():
+    Author.objects.create(name='池澤夏樹')
+
+
+def read_csv_lines(path):
+    with open(path, encoding='utf-8') as f:
+        lines = list(csv.reader(f))
+    return lines[1:]
+
+
+# コマンドからCSVを一括登録でき、処理速度が表示されることをテスト
+def test_import_books_command():
+    out = StringIO()
+    call_command('import_books', 'testFiles/book_upload_file_regular_test.csv',
+                 '--batch-size', '2', stdout=out)
+    assert 'Imported 3 books from 3 rows' in out.getvalue()
+    assert 'rows/s' in out.getvalue()
+    assert sorted(Book.objects.values_list('title', flat=True)) == [
+        'Title1', 'Title2', 'Title3']
+    assert Book.objects.get(title='Title2').authors.count() == 2
+
+
+# 画面からの登録と同じ検証でエラーになり、何も登録されないことをテスト
+def test_import_books_command_with_errors():
+    with pytest.raises(CommandError) as e:
+        call_command('import_books',
+                     'testFiles/book_upload_file_multiple_error_test.csv')
+    assert 'Required field are not entered' in str(e.value)
+    assert 'Wrong date format' in str(e.value)
+    assert Book.objects.count() == 0
+
+
+# PostgreSQLではCOPYと一時テーブルを使って登録されることをテスト
+@pytest.mark.postgresql
+def test_copy_importer(setup_existing_author):
+    lines = read_csv_lines('testFiles/book_upload_file_regular_test.csv')
+    lines.append(['星の王子様', '2006-03-28', 'サン・テグジュペリ,池澤夏樹', 'Novel'])
+    importer = get_importer(batch_size=2)
+    assert isinstance(importer, CopyBookImporter)
+    report = importer.stream(lines)
+    assert report.errors == []
+    assert report.imported == 4
+    book = Book.objects.get(title='星の王子様')
+    assert sorted(book.authors.values_list('name', flat=True)) == [
+        'サン・テグジュペリ', '池澤夏樹']
+    assert list(book.categories.values_list('name', flat=True)) == ['Novel']
+    assert book.fingerprint == book_fingerprint(
+        '星の王子様', ['サン・テグジュペリ', '池澤夏樹'])
+    # 既存の著者はそのまま使われる
+    assert Author.objects.filter(name='池澤夏樹').count() == 1
+    assert Book.objects.get(title='Title2').authors.count() == 2
+    # 採番した主キーの後も通常の登録ができる
+    Book.objects.create(title='人間の大地', published_date='2015-08-20')
+    assert Book.objects.count() == 5
@@ -0,0 +1,105 @@
+import pytest
+from book import jobs
+from book.models import Book, ImportJob
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from io import StringIO
+
+
+@pytest.fixture(autouse=True)
+def run_jobs_inline(monkeypatch):
+    # ワーカースレッドを使わず、コミット時にその場でジョブを実行する
+    # コミット時のコールバックを動かすため、ジョブを登録するテストはtransactional_dbを使う
+    class InlineExecutor:
+        def submit(self, fn, *args):
+            return jobs.run_import_job(*args)
+
+    monkeypatch.setattr(jobs, "get_executor", lambda: InlineExecutor())
+
+
+def upload(path):
+    with open(path) as f:
+        return SimpleUploadedFile(f.name, bytes(f.read(), encoding='utf-8'))
+
+
+# アップロードしたCSVがジョブとして登録され、完了後にステータスが取得できることをテスト
+def test_import_job(client, transactional_db):
+    response = client.post(
+        '/api/import-jobs',
+        {'csv': upload("testFiles/book_upload_file_regular_test.csv")})
+    assert response.status_code == 202
+    job_id = response.json()['id']
+
+    status = client.get(f'/api/import-jobs/{job_id}').json()
+    assert status['status'] == ImportJob.SUCCEEDED
+    assert status['rows'] == 3
+    assert status['imported'] == 3
+    assert status['errors'] == []
+    assert status['rows_per_second'] is not None
+    assert sorted(Book.objects.values_list('title', flat=True)) == [
+        'Title1', 'Title2', 'Title3']
+
+
+# エラーがあった場合にジョブが失敗し、エラー内容がステータスに含まれることをテスト
+def test_import_job_with_errors(client, transactional_db):
+    response = client.post(
+        '/api/import-jobs',
+        {'csv': upload("testFiles/book_upload_file_csv_duplicate_test.csv")})
+    status = client.get(f"/api/import-jobs/{response.json()['id']}").json()
+    assert status['status'] == ImportJob.FAILED
+    assert status['errors'] == ["['Title1'] have duplicate title and author"]
+    assert Book.objects.count() == 0
+
+
+# 画面からのアップロードでもジョブが登録されることをテスト
+def test_import_job_from_register_view(client, transactional_db):
+    response = client.post('/book-register/', {
+        'csv-import-background': 'True',
+        'csv': upload("testFiles/book_upload_file_regular_test.csv")
+    }, follow=True)
+    job = ImportJob.objects.get()
+    messages = list(response.context['messages'])
+    assert messages[0].message == f"Import job {job.pk} queued"
+    assert job.status == ImportJob.SUCCEEDED
+
+
+def test_import_job_not_found(client):
+    response = client.get('/api/import-jobs/999')
+    assert response.status_code == 404
+
+
+def unfinished_job(status):
+    return ImportJob.objects.create(
+        csv_file=upload("testFiles/book_upload_file_regular_test.csv"),
+        status=status)
+
+
+# 再起動で止まったジョブをコマンドで実行し直せることをテスト
+def test_resume_import_jobs():
+    queued = unfinished_job(ImportJob.QUEUED)
+    running = unfinished_job(ImportJob.RUNNING)
+    finished = ImportJob.objects.create(
+        csv_file='imports/done.csv', status=ImportJob.SUCCEEDED)
+    out = StringIO()
+    call_command('resume_import_jobs', stdout=out)
+    queued.refresh_from_db()
+    running.refresh_from_db()
+    finished.refresh_from_db()
+    assert queued.status == ImportJob.SUCCEEDED
+    assert queued.imported == 3
+    # 2件目は1件目と同じ本なので重複エラーになる
+    assert running.status == ImportJob.FAILED
+    assert finished.status == ImportJob.SUCCEEDED
+    assert f"Import job {queued.pk}: succeeded" in out.getvalue()
+    assert Book.objects.count() == 3
+
+
+# --failを指定すると止まったジョブが失敗として記録されることをテスト
+def test_resume_import_jobs_fail():
+    job = unfinished_job(ImportJob.RUNNING)
+    call_command('resume_import_jobs', '--fail', stdout=StringIO())
+    status = jobs.job_status(ImportJob.objects.get(pk=job.pk))
+    assert status['status'] == ImportJob.FAILED
+    assert status['errors'] == [jobs.INTERRUPTED_ERROR]
+    assert status['finished_at'] is not None
+    assert Book.objects.count() == 0
@@ -0,0 +1,83 @@
+import pytest
+from book.models import Author, Book, Category
+
+msgpack = pytest.importorskip('msgpack')
+
+MSGPACK = 'application/msgpack'
+
+
+@pytest.fixture()
+def setup_book_objects():
+    category = Category.objects.create(name='Novel')
+    author = Author.objects.create(name='サン・テグジュペリ')
+    for title in ['星の王子様', '人間の大地']:
+        book = Book.objects.create(title=title, published_date='2006-03-28')
+        book.categories.add(category)
+        book.authors.add(author)
+
+
+# Acceptか ?format= でMessagePackを指定するとJSONと同じ内容を返すことをテスト
+@pytest.mark.parametrize('url', [
+    '/api/books', '/books/', '/api/authors', '/authors/',
+    '/api/categories', '/categories/', '/api/books/search?q=星',
+])
+def test_msgpack_response(setup_book_objects, client, url):
+    expected = client.get(url).json()
+    response = client.get(url, HTTP_ACCEPT=MSGPACK)
+    assert response['Content-Type'] == MSGPACK
+    assert msgpack.unpackb(response.content) == expected
+    separator = '&' if '?' in url else '?'
+    response = client.get(f'{url}{separator}format=msgpack')
+    assert msgpack.unpackb(response.content) == expected
+
+
+# ストリーミングはJSONでしか返せないので、MessagePackを指定した場合は406を返すことをテスト
+@pytest.mark.parametrize('url', ['/api/books', '/books/'])
+def test_msgpack_stream_not_acceptable(setup_book_objects, client, url):
+    response = client.get(url, {'stream': '1'}, HTTP_ACCEPT=MSGPACK)
+    assert response.status_code == 406
+    assert not response.streaming
+    assert 'ETag' not in response
+
+
+# MessagePackのリクエストボディで登録・更新できることをテスト
+@pytest.mark.parametrize('url', ['/api/categories', '/categories/'])
+def test_msgpack_request(client, url):
+    response = client.post(
+        url, msgpack.packb({'name': 'Novel'}), content_type=MSGPACK,
+        HTTP_ACCEPT=MSGPACK)
+    assert response.status_code == 201
+    assert msgpack.unpackb(response.content)['name'] == 'Novel'
+    assert Category.objects.filter(name='Novel').exists()
+
+
+def test_msgpack_book_update(setup_book_objects, client):
+    book = Book.objects.get(title='星の王子様')
+    response = client.put(f'/api/books/{book.id}', msgpack.packb({
+        'title': '星の王子さま',
+        'published_date': '2006-03-28',
+        'categories': [{'name': 'Novel'}],
+        'authors': [{'name': 'サン・テグジュペリ'}],
+    }), content_type=MSGPACK)
+    assert response.status_code == 200
+    assert Book.objects.get(id=book.id).title == '星の王子さま'
+
+
+def test_msgpack_invalid_body(client):
+    response = client.post(
+        '/api/categories', b'\xc1', content_type=MSGPACK)
+    assert response.status_code == 400
+
+
+# 形式ごとにETagとキャッシュが分かれることをテスト
+def test_msgpack_etag_and_cache(setup_book_objects, client):
+    json_response = client.get('/api/books')
+    msgpack_response = client.get('/api/books', HTTP_ACCEPT=MSGPACK)
+    assert json_response['ETag'] != msgpack_response['ETag']
+    assert 'Accept' in msgpack_response['Vary']
+    response = client.get(
+        '/api/books', HTTP_ACCEPT=MSGPACK,
+        HTTP_IF_NONE_MATCH=json_response['ETag'])
+    assert response.status_code == 200
+    assert response['Content-Type'] == MSGPACK
+    assert client.get('/api/books')['Content-Type'] == 'application/json'
@@ -0,0 +1,79 @@
+import base64
+import json
+
+import pytest
+from book.models import Author, Book
+
+
+@pytest.fixture()
+def setup_many_books():
+    dates = ['2001-01-01', '1999-05-05', '2001-01-01', '2010-10-10', '1999-05-05']
+    for i in range(25):
+        Book.objects.create(title=f'Title{i}', published_date=dates[i % 5])
+    Author.objects.bulk_create([Author(name=f'Author{i}') for i in range(7)])
+
+
+def walk(client, url, key='title'):
+    # nextリンクを辿って全ページの結果を集める
+    items, pages = [], 0
+    while url:
+        data = client.get(url).json()
+        items += [item[key] for item in data['results']]
+        url = data['next']
+        pages += 1
+    return items, pages
+
+
+# 全件がページをまたいで重複・欠落なく取得できることをテスト
+@pytest.mark.parametrize('url', ['/api/books?page_size=10', '/books/?page_size=10'])
+def test_book_pages(setup_many_books, client, url):
+    titles, pages = walk(client, url)
+    assert pages == 3
+    assert titles == [f'Title{i}' for i in range(25)]
+
+
+# 出版日順（同じ日付はid順）でもページをまたいで正しく並ぶことをテスト
+def test_book_pages_by_published_date(setup_many_books, client):
+    titles, _ = walk(client, '/api/books?page_size=4&ordering=published_date')
+    expected = Book.objects.order_by('published_date', 'id').values_list('title', flat=True)
+    assert titles == list(expected)
+
+
+# previousリンクで前のページに戻れることをテスト
+def test_previous_page(setup_many_books, client):
+    first = client.get('/api/books?page_size=10').json()
+    assert first['previous'] is None
+    second = client.get(first['next']).json()
+    back = client.get(second['previous']).json()
+    assert back['results'] == first['results']
+
+
+@pytest.mark.parametrize('url', ['/api/authors?page_size=3', '/authors/?page_size=3'])
+def test_author_pages(setup_many_books, client, url):
+    names, pages = walk(client, url, key='name')
+    assert pages == 3
+    assert names == [f'Author{i}' for i in range(7)]
+
+
+def test_invalid_cursor(client):
+    response = client.get('/api/books?cursor=invalid')
+    assert response.status_code == 404
+
+
+def encode_cursor(keys, reverse=False):
+    data = json.dumps({'k': keys, 'r': reverse})
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+
+# 形式は正しいがキーの型が合わないカーソルが404になることをテスト
+@pytest.mark.parametrize('query', [
+    f"cursor={encode_cursor(['abc'])}",
+    f"cursor={encode_cursor([None])}",
+    f"cursor={encode_cursor([[1]])}",
+    f"ordering=published_date&cursor={encode_cursor(['abc', 1])}",
+    f"ordering=published_date&cursor={encode_cursor(['2001-01-01', 'x'])}",
+])
+@pytest.mark.parametrize('url', ['/api/books', '/api/authors'])
+def test_malformed_cursor_keys(setup_many_books, client, url, query):
+    response = client.get(f'{url}?{query}')
+    assert response.status_code == 404
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from book.models import Author, Book, Category
+
+# 本の件数に関係なく、各エンドポイントが発行してよいクエリ数
+# （APIはETag用のバージョン取得の1クエリを含む）
+QUERY_BUDGETS = {
+    '/api/books': 4,
+    '/books/': 4,
+    '/api/authors': 2,
+    '/authors/': 2,
+    '/api/categories': 2,
+    '/categories/': 2,
+}
+DETAIL_QUERY_BUDGETS = {
+    '/api/books/{id}': 4,
+    '/books/{id}/': 4,
+    '/book-detail/{id}': 3,
+}
+
+
+def create_books(count):
+    categories = [Category.objects.create(name=f'Category{i}') for i in range(3)]
+    authors = [Author.objects.create(name=f'Author{i}') for i in range(5)]
+    for i in range(count):
+        book = Book.objects.create(title=f'Title{i}', published_date='2006-03-28')
+        book.categories.add(categories[i % 3])
+        book.authors.add(authors[i % 5], authors[(i + 1) % 5])
+    return book
+
+
+@pytest.mark.parametrize('size', [1, 10, 50])
+@pytest.mark.parametrize('url', QUERY_BUDGETS)
+def test_list_query_budget(client, django_assert_max_num_queries, url, size):
+    create_books(size)
+    with django_assert_max_num_queries(QUERY_BUDGETS[url]):
+        response = client.get(url)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('size', [1, 10])
+@pytest.mark.parametrize('url', DETAIL_QUERY_BUDGETS)
+def test_detail_query_budget(client, django_assert_max_num_queries, url, size):
+    book = create_books(size)
+    with django_assert_max_num_queries(DETAIL_QUERY_BUDGETS[url]):
+        response = client.get(url.format(id=book.id))
+    assert response.status_code == 200
+
+
+# 更新後のレスポンスも更新後の著者・カテゴリーを返すことをテスト
+def test_book_update_returns_new_relations(client):
+    book = create_books(1)
+    response = client.put(f'/api/books/{book.id}', json.dumps({
+        'title': 'New Title',
+        'published_date': '2006-03-28',
+        'categories': [{'name': 'Category9'}],
+        'authors': [{'name': 'Author9'}]
+    }), content_type='application/json')
+    assert response.status_code == 200
+    assert response.json()['authors'][0]['name'] == 'Author9'
+    assert response.json()['categories'][0]['name'] == 'Category9'
+
+
+def relation_writes(queries):
+    through_tables = (
+        Book.authors.through._meta.db_table,
+        Book.categories.through._meta.db_table,
+    )
+    return [
+        query['sql'] for query in queries
+        if query['sql'].startswith(('INSERT', 'DELETE'))
+        and any(table in query['sql'] for table in through_tables)
+    ]
+
+
+# タイトルだけを変更した場合は中間テーブルへの書き込みが発生しないことをテスト
+def test_book_update_title_only_keeps_relations(client):
+    book = create_books(1)
+    data = {
+        'title': 'New Title',
+        'published_date': '2006-03-28',
+        'categories': [{'name': c.name} for c in book.categories.all()],
+        'authors': [{'name': a.name} for a in book.authors.all()],
+    }
+    with CaptureQueriesContext(connection) as queries:
+        response = client.put(
+            f'/api/books/{book.id}', json.dumps(data),
+            content_type='application/json')
+    assert response.status_code == 200
+    assert relation_writes(queries.captured_queries) == []
+
+
+# 変更のあった著者だけを追加・削除することをテスト
+def test_book_update_writes_only_changed_relations(client):
+    book = create_books(1)
+    data = {
+        'title': 'Title0',
+        'published_date': '2006-03-28',
+        'categories': [{'name': c.name} for c in book.categories.all()],
+        'authors': [{'name': 'Author0'}, {'name': 'Author9'}],
+    }
+    with CaptureQueriesContext(connection) as queries:
+        response = client.put(
+            f'/api/books/{book.id}', json.dumps(data),
+            content_type='application/json')
+    assert response.status_code == 200
+    writes = relation_writes(queries.captured_queries)
+    assert len(writes) == 2
+    assert sorted(book.authors.values_list('name', flat=True)) == [
+        'Author0', 'Author9']
+
+
+# 編集画面からタイトルだけを変更した場合も同様であることをテスト
+def test_book_edit_view_title_only_keeps_relations(client):
+    book = create_books(1)
+    form_data = {
+        'title': 'New Title',
+        'published_date': '2006-03-28',
+        'categories': [c.pk for c in book.categories.all()],
+        'authors': [a.pk for a in book.authors.all()],
+    }
+    with CaptureQueriesContext(connection) as queries:
+        client.post(reverse('book:book edit', kwargs={'id': book.id}), form_data)
+    assert Book.objects.get(id=book.id).title == 'New Title'
+    assert relation_writes(queries.captured_queries) == []
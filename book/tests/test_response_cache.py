@@ -0,0 +1,80 @@
+import json
+
+import pytest
+from book.models import Author, Book, Category
+
+
+@pytest.fixture()
+def setup_book_objects():
+    category = Category.objects.create(name='Novel')
+    author = Author.objects.create(name='サン・テグジュペリ')
+    for title in ['星の王子様', '人間の大地']:
+        book = Book.objects.create(title=title, published_date='2006-03-28')
+        book.categories.add(category)
+        book.authors.add(author)
+
+
+def stats(client):
+    return client.get('/api/cache-stats').json()
+
+
+# 2回目以降はキャッシュからバージョン取得の1クエリだけで返すことをテスト
+@pytest.mark.parametrize('url', ['/api/books', '/books/', '/api/authors', '/categories/'])
+def test_cache_hit(setup_book_objects, client, django_assert_num_queries, url):
+    first = client.get(url)
+    with django_assert_num_queries(1):
+        second = client.get(url)
+    assert second.status_code == 200
+    assert json.loads(second.content) == json.loads(first.content)
+    assert stats(client) == {'hits': 1, 'misses': 1}
+
+
+# 検索条件ごとに別のエントリになることをテスト
+def test_cache_key_includes_filter(setup_book_objects, client):
+    assert len(client.get('/api/books?title=星').json()['results']) == 1
+    assert len(client.get('/api/books?title=人間').json()['results']) == 1
+    assert len(client.get('/api/books').json()['results']) == 2
+    assert stats(client) == {'hits': 0, 'misses': 3}
+
+
+# 本・著者・中間テーブルの変更でキャッシュが使われなくなることをテスト
+def test_cache_invalidated_on_write(setup_book_objects, client):
+    client.get('/api/books')
+    author = Author.objects.get()
+    author.name = '池澤夏樹'
+    author.save()
+    data = client.get('/api/books').json()
+    assert data['results'][0]['authors'][0]['name'] == '池澤夏樹'
+
+    book = Book.objects.get(title='人間の大地')
+    book.categories.add(Category.objects.create(name='Design'))
+    data = client.get('/api/books').json()
+    assert [c['name'] for c in data['results'][1]['categories']] == ['Novel', 'Design']
+    assert stats(client) == {'hits': 0, 'misses': 3}
+
+
+# 関係の無いリソースへの書き込みではキャッシュが残ることをテスト
+def test_cache_kept_for_other_resource(setup_book_objects, client):
+    client.get('/api/categories')
+    Author.objects.create(name='池澤夏樹')
+    client.get('/api/categories')
+    assert stats(client) == {'hits': 1, 'misses': 1}
+
+
+# キャッシュから返す場合も、元のレスポンスと同じヘッダーになることをテスト
+def test_cache_hit_keeps_headers(setup_book_objects, client):
+    first = client.get('/api/books')
+    second = client.get('/api/books')
+    assert stats(client) == {'hits': 1, 'misses': 1}
+    for header in ['Content-Type', 'Allow']:
+        assert second[header] == first[header]
+
+
+# ブラウザ用のHTMLはキャッシュせず、毎回CSRFトークンのクッキーを返すことをテスト
+def test_html_not_cached(setup_book_objects, client):
+    for _ in range(2):
+        client.cookies.clear()
+        response = client.get('/api/books', HTTP_ACCEPT='text/html')
+        assert response['Content-Type'].startswith('text/html')
+        assert 'csrftoken' in response.cookies
+    assert stats(client) == {'hits': 0, 'misses': 2}
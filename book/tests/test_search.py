@@ -0,0 +1,119 @@
+import pytest
+from book.models import Author, Book, Category
+from book.search import SearchIndex, filter_contains, ranked_ids
+
+
+@pytest.fixture()
+def setup_book_objects():
+    for title, published_date in [
+        ('星の王子様', '2006-03-28'),
+        ('人間の大地', '2015-08-20'),
+        ('夜間飛行', '1931-01-01'),
+        ('星', '2000-01-01'),
+        ('The Little Prince', '1943-04-06'),
+        ('Little Women', '1868-09-30'),
+    ]:
+        Book.objects.create(title=title, published_date=published_date)
+    Author.objects.create(name='サン・テグジュペリ')
+    Author.objects.create(name='池澤夏樹')
+    Category.objects.create(name='Novel')
+
+
+# 日本語の部分一致・全角半角や大文字小文字の違いを無視した検索をテスト
+@pytest.mark.parametrize('query, expected', [
+    ('王子', {1}),
+    ('大地', {2}),
+    ('間', {2, 3}),
+    ('little', {4, 5}),
+    ('ＬＩＴＴＬＥ　prince', {4}),
+    ('prince little', {4}),
+    ('王女', set()),
+])
+def test_search_index_match(query, expected):
+    index = SearchIndex([
+        (1, '星の王子様'),
+        (2, '人間の大地'),
+        (3, '夜間飛行'),
+        (4, 'The Little Prince'),
+        (5, 'Little Women'),
+    ])
+    assert index.match(query) == expected
+
+
+# 完全一致・前方一致・語の先頭での一致・部分一致の順に並ぶことをテスト
+def test_search_index_rank():
+    index = SearchIndex([
+        (1, '王子様の星'),
+        (2, '星の王子様'),
+        (3, '星'),
+        (4, 'The Star Prince'),
+        (5, 'Star'),
+        (6, 'Lodestar'),
+    ])
+    assert index.search('星') == [3, 2, 1]
+    assert index.search('star') == [5, 4, 6]
+    assert index.search('star', limit=1) == [5]
+
+
+def test_book_list_title_filter(setup_book_objects, client):
+    data = client.get('/api/books', {'title': '星'}).json()
+    assert [book['title'] for book in data['results']] == ['星の王子様', '星']
+
+
+@pytest.mark.parametrize('url, name', [
+    ('/api/authors', 'テグジュ'),
+    ('/api/categories', 'nov'),
+])
+def test_name_filter(setup_book_objects, client, url, name):
+    data = client.get(url, {'name': name}).json()
+    assert len(data['results']) == 1
+
+
+# 関連度順に並ぶことをテスト
+def test_book_search(setup_book_objects, client):
+    data = client.get('/api/books/search', {'q': '星', 'fields': 'title'}).json()
+    assert data['results'] == [{'title': '星'}, {'title': '星の王子様'}]
+    data = client.get('/api/books/search', {'q': 'little', 'limit': 1}).json()
+    assert [book['title'] for book in data['results']] == ['Little Women']
+    assert client.get('/api/books/search').json() == {'results': []}
+
+
+# 本が追加・変更されたら索引が作り直されることをテスト
+def test_search_index_refresh(setup_book_objects, client):
+    assert filter_contains(Book.objects.all(), 'title', '飛行', 'book').count() == 1
+    Book.objects.create(title='南方飛行', published_date='1929-01-01')
+    book = Book.objects.get(title='人間の大地')
+    book.title = '人間の飛行'
+    book.save()
+    data = client.get('/api/books/search', {'q': '飛行'}).json()
+    assert [book['title'] for book in data['results']] == [
+        '夜間飛行', '南方飛行', '人間の飛行']
+
+
+# PostgreSQLではトライグラムのインデックスとLIKEで絞り込み、同じ結果になることをテスト
+# 3文字未満の語（インデックスで絞り込めない）も同じように扱われる
+@pytest.mark.postgresql
+@pytest.mark.parametrize('query, expected', [
+    ('王子', {'星の王子様'}),
+    ('間', {'人間の大地', '夜間飛行'}),
+    ('little', {'The Little Prince', 'Little Women'}),
+    ('ＬＩＴＴＬＥ　prince', {'The Little Prince'}),
+    ('prince little', {'The Little Prince'}),
+    ('王女', set()),
+])
+def test_filter_contains_postgresql(setup_book_objects, query, expected):
+    queryset = filter_contains(Book.objects.all(), 'title', query, 'book')
+    assert set(queryset.values_list('title', flat=True)) == expected
+
+
+# PostgreSQLでも完全一致・前方一致の順に並び、類似度で並べ替えられることをテスト
+@pytest.mark.postgresql
+@pytest.mark.parametrize('query, expected', [
+    ('星', ['星', '星の王子様']),
+    ('little', ['Little Women', 'The Little Prince']),
+    ('the little prince', ['The Little Prince']),
+])
+def test_ranked_ids_postgresql(setup_book_objects, query, expected):
+    ids = ranked_ids(Book, 'title', query, 'book', 10)
+    titles = Book.objects.in_bulk(ids)
+    assert [titles[pk].title for pk in ids] == expected
@@ -11,11 +11,27 @@ app_name = "book"
 urlpatterns = [
     path("", include(router.urls)),
     path("api/books", views.book_list),
+    path("api/books/bulk", views.book_bulk),
+    path("api/books/search", views.book_search),
+    path("api/books/facets", views.book_facets),
     path("api/books/<int:id>", views.book_detail),
     path("api/authors", views.author_list),
+    path(
+        "api/authors/autocomplete",
+        views.author_autocomplete,
+        name="author autocomplete",
+    ),
     path("api/authors/<int:id>", views.author_detail),
     path("api/categories", views.category_list),
+    path(
+        "api/categories/autocomplete",
+        views.category_autocomplete,
+        name="category autocomplete",
+    ),
     path("api/categories/<int:id>", views.category_detail),
+    path("api/cache-stats", views.api_cache_stats),
+    path("api/import-jobs", views.import_job_list),
+    path("api/import-jobs/<int:id>", views.import_job_detail),
     path("home/", views.home_page, name="home"),
     path("author/", views.author_view, name="author"),
     path("author-edit/<int:id>", views.author_edit_view, name="author edit"),
@@ -28,6 +44,7 @@ urlpatterns = [
         "category-delete/<int:id>", views.category_delete_view, name="category delete"
     ),
     path("book-shelf/", views.book_shelf_view, name="book shelf"),
+    path("book-export/", views.book_export_view, name="book export"),
     path("book-register/", views.book_register_view, name="book register"),
     path("book-edit/<int:id>", views.book_edit_view, name="book edit"),
     path("book-detail/<int:id>", views.book_detail_view, name="book detail"),
@@ -0,0 +1,79 @@
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+from .models import TableVersion
+from .renderers import response_format
+
+BOOK = "book"
+AUTHOR = "author"
+CATEGORY = "category"
+
+
+def bump(*names):
+    for name in names:
+        updated = TableVersion.objects.filter(name=name).update(
+            version=F("version") + 1
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    TableVersion.objects.create(name=name, version=1)
+            except IntegrityError:
+                TableVersion.objects.filter(name=name).update(version=F("version") + 1)
+
+
+def get_versions(*names):
+    versions = dict(
+        TableVersion.objects.filter(name__in=names).values_list("name", "version")
+    )
+    return [versions.get(name, 0) for name in names]
+
+
+def version_key(*names):
+    return "-".join(str(version) for version in get_versions(*names))
+
+
+def request_version_key(request, *names):
+    # 同じリクエストの中ではバージョンの取得を1回にする
+    cached = request.__dict__.setdefault("_table_versions", {})
+    if names not in cached:
+        cached[names] = version_key(*names)
+    return cached[names]
+
+
+# APIのリソースごとに、レスポンスの内容に関係するテーブル
+BOOK_TABLES = (BOOK, AUTHOR, CATEGORY)
+AUTHOR_TABLES = (AUTHOR,)
+CATEGORY_TABLES = (CATEGORY,)
+
+
+def versioned(*names):
+    # テーブルのバージョンをETagにして、変更が無ければ304を返す
+    # 書き込み時はバージョンを読まない
+    # 同じURLでもAcceptによって形式（JSON/MessagePack/HTML等）が変わるので、形式もETagに含める
+    # 404などのエラーには内容に対応するETagが無いので付けない（再検証で304にしない）
+    def etag(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return None
+        return f"{request_version_key(request, *names)}-{response_format(request)}"
+
+    conditional = condition(etag_func=etag)
+
+    def decorator(view):
+        view = conditional(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if not (200 <= response.status_code < 300 or response.status_code == 304):
+                del response["ETag"]
+            patch_vary_headers(response, ["Accept"])
+            return response
+
+        return wrapper
+
+    return decorator
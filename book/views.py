@@ -1,19 +1,63 @@
 import csv
 import datetime
+import json
+import os
 from io import TextIOWrapper
 
 from django.contrib import messages
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    StreamingHttpResponse,
+)
 from django.http.response import JsonResponse
 from django.shortcuts import redirect, render
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition, require_GET
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, parser_classes, renderer_classes
+from rest_framework.exceptions import NotAcceptable, NotFound, ParseError
+from rest_framework.generics import get_object_or_404
 from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from . import versions
+from .caching import cache_stats, cached_response
+from .exporter import (
+    export_snapshot,
+    iter_file,
+    iter_ndjson,
+    iter_serialized_chunks,
+    stream_json_array,
+    stream_ndjson,
+    snapshot_version,
+    stream_gzip,
+)
+from .facets import FACET_LIMIT, count_facets
 from .forms import AuthorForm, BookForm, CategoryForm
-from .models import Author, Book, Category
-from .serializers import AuthorSerializer, BookSerializer, CategorySerializer
+from .importer import BookImporter
+from .jobs import enqueue, job_status
+from .models import Author, Book, Category, ImportJob
+from .pagination import BookPagination, KeysetPagination
+from .renderers import API_PARSERS, API_RENDERERS, BOOK_RENDERERS, NDJSONRenderer
+from .search import autocomplete_ids, filter_contains, ranked_ids
+from .serializers import (
+    BOOK_FIELDS,
+    AuthorSerializer,
+    BookSerializer,
+    CategorySerializer,
+    book_values_fields,
+    requested_book_fields,
+    serialize_book_rows,
+    validate_book_items,
+)
+from .versions import versioned
 
 
 # Create your views here.
@@ -111,36 +155,123 @@ def category_delete_view(request, id):
     return render(request, "book/category_delete.html", {"category": category})
 
 
+class ShelfPagination(BookPagination):
+    page_size = 50
+
+
+def url_prefix(name):
+    # 行ごとに {% url %} を逆引きせず、1回だけ逆引きしたURLにidを付けて使う
+    url = reverse(name, kwargs={"id": 0})
+    return url[: -len("0")]
+
+
+def filter_books_by_relation(books, field, model, name, version_name):
+    # 著者名・カテゴリー名で絞り込む（中間テーブルの副問い合わせなので本は重複しない）
+    through = Book._meta.get_field(field).remote_field.through
+    related = filter_contains(model.objects.all(), "name", name, version_name)
+    return books.filter(
+        pk__in=through.objects.filter(
+            **{f"{model._meta.model_name}__in": related}
+        ).values("book_id")
+    )
+
+
 def book_shelf_view(request):
-    books = Book.objects.all()
     if request.method == "POST":
         if "csv-export" in request.POST:
-            response = HttpResponse(content_type="text/csv")
-            today_string = datetime.datetime.today().strftime("%x")
+            return book_export_response(request.POST.get("format", "csv"))
+
+    # 1ページ分の本だけを取得し、表示に使うカラムに絞る
+    books = Book.objects.only("id", "title", "published_date")
+    filters = {
+        key: request.GET.get(key, "").strip()
+        for key in ("title", "author", "category")
+    }
+    if filters["title"]:
+        books = filter_contains(books, "title", filters["title"], versions.BOOK)
+    if filters["author"]:
+        books = filter_books_by_relation(
+            books, "authors", Author, filters["author"], versions.AUTHOR
+        )
+    if filters["category"]:
+        books = filter_books_by_relation(
+            books, "categories", Category, filters["category"], versions.CATEGORY
+        )
+
+    paginator = ShelfPagination()
+    try:
+        page = paginator.paginate_queryset(books, Request(request))
+    except NotFound:
+        # APIと同じく、キーの型が合わないカーソルもここで404になる
+        raise Http404(paginator.invalid_cursor_message)
+    return render(
+        request,
+        "book/book_shelf.html",
+        {
+            "books": page,
+            "filters": filters,
+            "next_url": paginator.get_next_link(),
+            "previous_url": paginator.get_previous_link(),
+            "edit_url": url_prefix("book:book edit"),
+            "detail_url": url_prefix("book:book detail"),
+            "delete_url": url_prefix("book:book delete"),
+        },
+    )
+
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "csv.gz": ("application/gzip", "csv.gz"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+def book_export_response(export_format="csv", version=None):
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown export format")
+    content_type, extension = EXPORT_FORMATS[export_format]
+    today_string = datetime.datetime.today().strftime("%x")
+    if export_format == "csv":
+        response = FileResponse(open(export_snapshot(version), "rb"))
+    elif export_format == "csv.gz":
+        response = StreamingHttpResponse(stream_gzip(iter_file(export_snapshot(version))))
+    else:
+        response = StreamingHttpResponse(iter_ndjson())
+    response["Content-Type"] = content_type
+    # ファイル名　'book_detail_01_16_21.csv'
+    response[
+        "Content-Disposition"
+    ] = f'attachment; filename="book_detail_{today_string}.{extension}"'
+    return response
+
+
+def export_format(request):
+    return request.GET.get("format", "csv")
+
+
+def export_version(request):
+    # ETagとLast-Modifiedの計算でバージョンの取得を1回にする
+    if not hasattr(request, "export_version"):
+        request.export_version = snapshot_version()
+    return request.export_version
+
+
+def export_etag(request):
+    return f"{export_version(request)}-{export_format(request)}"
+
+
+def export_last_modified(request):
+    # CSVから作る形式のみ、出力ファイルの更新日時を使う
+    if export_format(request) not in ("csv", "csv.gz"):
+        return None
+    modified = os.path.getmtime(export_snapshot(export_version(request)))
+    return datetime.datetime.fromtimestamp(modified, tz=datetime.timezone.utc)
 
-            # ファイル名　'book_detail_01_16_21.csv'
-            response[
-                "Content-Disposition"
-            ] = f'attachment; filename="book_detail_{today_string}.csv"'
-
-            writer = csv.writer(response)
-            # ヘッダー
-            writer.writerow(["No.", "Title", "Published Date", "Author", "Category"])
-            for index, book in enumerate(
-                Book.objects.all().prefetch_related("authors", "categories"), 1
-            ):
-                authors = ", ".join([author.name for author in book.authors.all()])
-                categories = ", ".join(
-                    [category.name for category in book.categories.all()]
-                )
-
-                # ""で囲んで表示したい場合は f'"{authors}"'
-
-                writer.writerow(
-                    [index, book.title, book.published_date, authors, categories]
-                )
-            return response
-    return render(request, "book/book_shelf.html", {"books": books})
+
+@require_GET
+@condition(etag_func=export_etag, last_modified_func=export_last_modified)
+def book_export_view(request):
+    return book_export_response(export_format(request), export_version(request))
 
 
 def book_register_view(request):
@@ -160,106 +291,38 @@ def book_register_view(request):
 
         # CSVの一括アップロード機能
         elif 'csv-import' in request.POST:
-            print("CSV")
-            print(request.FILES)
             if not request.FILES['csv'].name.endswith('.csv'):
                 messages.error(request, "Wrong File Format")
                 return redirect("book:book shelf")
-            form_data = TextIOWrapper(
-                request.FILES['csv'].file, encoding='utf-8')
-            print(form_data)
+            upload = request.FILES['csv']
+            form_data = TextIOWrapper(upload.file, encoding='utf-8')
             csv_file = csv.reader(form_data)
             next(csv_file, None)
-            duplicate_list, error_list = [], []
-            empty_error, date_format_error = " ", " "
-            date_format = "%Y-%m-%d"
-            import_books = []
-            import_details = {}
-            print(csv_file)
-            for line in csv_file:
-                print("INDIVIDUAL")
-                # 空欄が無いかの確認
-                if line[0] == "" or line[1] == "" or line[2] == "" or line[3] == "":
-                    empty_error = "Required field are not entered. Please fill required field"
-                    continue
-
-                # 日付の入力形式の確認
-                try:
-                    datetime.datetime.strptime(line[1], date_format)
-                except ValueError:
-                    date_format_error = "Wrong date format. It must be in YYYY-MM-DD"
-                    continue
-
-                duplicate = False
-                author_names = line[2].split(",")
-                category_names = line[3].split(",")
-                # タイトルと著者の完全一致が無いかの確認
-                if Book.objects.filter(title=line[0]):
-                    same_books = list(Book.objects.filter(title=line[0]))
-                    for same_book in same_books:
-                        exist_authors = list(
-                            same_book.authors.values_list('name', flat=True))
-                        if sorted(exist_authors) == sorted(author_names):
-                            duplicate = True
-                            duplicate_list.append(line[0])
-                            break
-
-                for import_book in import_books:
-                    if import_book.get("title") == line[0] and import_book.get("authors") == author_names:
-                        duplicate = True
-                        duplicate_list.append(line[0])
-                        break
-
-                if duplicate:
-                    continue
-
-                import_details["title"] = line[0]
-                import_details["published_date"] = line[1]
-                import_details["authors"] = author_names
-                import_details["categories"] = category_names
-
-                import_books.append(import_details)
-                import_details = {}
-
-            if len(duplicate_list) != 0:
-                error_list.append(
-                    f"{duplicate_list} have duplicate title and author")
-            else:
-                pass
-
-            if empty_error.isspace() == False:
-                error_list.append(empty_error)
+            # 大きなファイルはバッチごとに検証・登録する
+            if upload.multiple_chunks():
+                report = BookImporter().stream(csv_file)
             else:
-                pass
+                report = BookImporter().run(csv_file)
 
-            if date_format_error.isspace() == False:
-                error_list.append(date_format_error)
-            else:
-                pass
-
-            if len(error_list) != 0:
-                for error in error_list:
+            if len(report.errors) != 0:
+                for error in report.errors:
                     messages.warning(request, error)
                 return redirect("book:book shelf")
             # エラーが無ければ一括登録
             else:
-                print("START")
-                print(import_books)
-                for import_book in import_books:
-                    print(import_book)
-                    book = Book.objects.create(
-                        title=import_book["title"], published_date=import_book["published_date"])
-                    for author_name in import_book["authors"]:
-                        author, _ = Author.objects.get_or_create(
-                            name=author_name)
-                        book.authors.add(author)
-                    for category_name in import_book["categories"]:
-                        category, _ = Category.objects.get_or_create(
-                            name=category_name)
-                        book.categories.add(category)
                 messages.success(request, "Form submission successful")
                 return redirect("book:book shelf")
 
+        # CSVの一括アップロード機能（バックグラウンド実行）
+        elif 'csv-import-background' in request.POST:
+            if not request.FILES['csv'].name.endswith('.csv'):
+                messages.error(request, "Wrong File Format")
+                return redirect("book:book shelf")
+            job = ImportJob.objects.create(csv_file=request.FILES['csv'])
+            enqueue(job)
+            messages.success(request, f"Import job {job.pk} queued")
+            return redirect("book:book shelf")
+
         # CSVインポート用のテンプレダウンロード機能
         elif 'export-template' in request.POST:
             response = HttpResponse(content_type="text/csv; charset=UTF-8")
@@ -294,7 +357,7 @@ def book_edit_view(request, id):
 
 
 def book_detail_view(request, id):
-    book = Book.objects.get(id=id)
+    book = Book.objects.prefetch_related("authors", "categories").get(id=id)
     return render(request, "book/book_detail.html", {"book": book})
 
 
@@ -307,71 +370,293 @@ def book_delete_view(request, id):
     return render(request, "book/book_delete.html", {"book": book})
 
 
+# 一覧を全件まとめて取得する場合は ?stream=1（JSON配列）か
+# Accept: application/x-ndjson（1行1冊）でストリーミングして返す
+def stream_format(request):
+    if request.accepted_renderer.format == NDJSONRenderer.format:
+        return "ndjson"
+    if request.query_params.get("stream", "") in ("1", "true", "json"):
+        # ストリーミングはJSONでしか返せないので、他の形式（ETagも別）は受け付けない
+        if request.accepted_renderer.format != "json":
+            raise NotAcceptable("Streaming is only available as JSON or NDJSON")
+        return "json"
+    return None
+
+
+def streaming_books_response(books, fields, stream):
+    # メモリ使用量がチャンクの大きさまでで済むよう、少しずつエンコードして返す
+    chunks = iter_serialized_chunks(books, fields)
+    if stream == "ndjson":
+        return StreamingHttpResponse(
+            stream_ndjson(chunks), content_type=NDJSONRenderer.media_type
+        )
+    return StreamingHttpResponse(
+        stream_json_array(chunks), content_type="application/json"
+    )
+
+
+@method_decorator(versioned(*versions.BOOK_TABLES), name="dispatch")
+@method_decorator(cached_response(*versions.BOOK_TABLES), name="dispatch")
 class BookViewSet(ModelViewSet):
-    queryset = Book.objects.all()
+    queryset = Book.objects.prefetch_related("authors", "categories")
     serializer_class = BookSerializer
+    pagination_class = BookPagination
+    renderer_classes = BOOK_RENDERERS
+    parser_classes = API_PARSERS
+
+    # 読み取りはModelSerializerを通さずに values() から直接組み立てる
+    # ?fields= と ?expand= に合わせて取得するカラムと関連を絞り込む
+    def list(self, request, *args, **kwargs):
+        fields = requested_book_fields(request.query_params)
+        columns = book_values_fields(fields, self.paginator.get_ordering(request))
+        books = self.filter_queryset(Book.objects.values(*columns))
+        stream = stream_format(request)
+        if stream is not None:
+            return streaming_books_response(books, fields, stream)
+        page = self.paginate_queryset(books)
+        return self.get_paginated_response(serialize_book_rows(page, fields))
+
+    def retrieve(self, request, *args, **kwargs):
+        fields = requested_book_fields(request.query_params)
+        # 数字以外のidもget_object_or_404が404にする
+        row = get_object_or_404(
+            Book.objects.values(*book_values_fields(fields)),
+            **{self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]},
+        )
+        return Response(serialize_book_rows([row], fields)[0])
 
 
+@method_decorator(versioned(*versions.AUTHOR_TABLES), name="dispatch")
+@method_decorator(cached_response(*versions.AUTHOR_TABLES), name="dispatch")
 class AuthorViewSet(ModelViewSet):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
+    pagination_class = KeysetPagination
+    renderer_classes = API_RENDERERS
+    parser_classes = API_PARSERS
 
 
+@method_decorator(versioned(*versions.CATEGORY_TABLES), name="dispatch")
+@method_decorator(cached_response(*versions.CATEGORY_TABLES), name="dispatch")
 class CategoryViewSet(ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    pagination_class = KeysetPagination
+    renderer_classes = API_RENDERERS
+    parser_classes = API_PARSERS
+
+
+def paginated_response(request, queryset, serializer_class, pagination_class):
+    # 一覧APIはカーソル（キーセット）方式でページ分割して返す
+    paginator = pagination_class()
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True)
+    return Response(paginator.get_paginated_data(serializer.data))
 
 
+@versioned(*versions.BOOK_TABLES)
+@cached_response(*versions.BOOK_TABLES)
 @api_view(["GET", "POST"])
+@renderer_classes(BOOK_RENDERERS)
+@parser_classes(API_PARSERS)
 def book_list(request):
     # GET list of tutorials, POST a new tutorial, DELETE all tutorials
     if request.method == "GET":
-        books = Book.objects.all()
+        paginator = BookPagination()
+        fields = requested_book_fields(request.query_params)
+        columns = book_values_fields(fields, paginator.get_ordering(request))
+        books = Book.objects.values(*columns)
 
         title = request.GET.get("title", None)
         if title is not None:
-            books = books.filter(title__icontains=title)
-
-        books_serializer = BookSerializer(books, many=True)
-        return JsonResponse(books_serializer.data, safe=False)
-        # 'safe=False' for objects serialization
+            books = filter_contains(books, "title", title, versions.BOOK)
+
+        stream = stream_format(request)
+        if stream is not None:
+            return streaming_books_response(books, fields, stream)
+        page = paginator.paginate_queryset(books, request)
+        return Response(
+            paginator.get_paginated_data(serialize_book_rows(page, fields))
+        )
     elif request.method == "POST":
-        book_data = JSONParser().parse(request)
+        book_data = request.data
         book_serializer = BookSerializer(data=book_data)
         if book_serializer.is_valid():
             book_serializer.save()
-            return JsonResponse(book_serializer.data, status=status.HTTP_201_CREATED)
-        return JsonResponse(book_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return Response(book_serializer.data, status=status.HTTP_201_CREATED)
+        return Response(book_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@versioned(*versions.BOOK_TABLES)
+@cached_response(*versions.BOOK_TABLES)
 @api_view(["GET", "PUT", "DELETE"])
+@renderer_classes(API_RENDERERS)
+@parser_classes(API_PARSERS)
 def book_detail(request, id):
     # find tutorial by pk (id)
+    if request.method == "GET":
+        fields = requested_book_fields(request.query_params)
+        books = serialize_book_rows(
+            Book.objects.filter(id=id).values(*book_values_fields(fields)), fields
+        )
+        if not books:
+            return Response(
+                {"message": "The book does not exist"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(books[0])
     try:
-        book = Book.objects.get(id=id)
+        book = Book.objects.prefetch_related("authors", "categories").get(id=id)
     except Book.DoesNotExist:
-        return JsonResponse(
+        return Response(
             {"message": "The book does not exist"}, status=status.HTTP_404_NOT_FOUND
         )
-    if request.method == "GET":
-        book_serializer = BookSerializer(book)
-        return JsonResponse(book_serializer.data)
-    elif request.method == "PUT":
-        book_data = JSONParser().parse(request)
+    if request.method == "PUT":
+        book_data = request.data
         book_serializer = BookSerializer(book, data=book_data)
         if book_serializer.is_valid():
             book_serializer.save()
-            return JsonResponse(book_serializer.data)
-        return JsonResponse(book_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return Response(book_serializer.data)
+        return Response(book_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     elif request.method == "DELETE":
         book.delete()
-        return JsonResponse(
+        return Response(
             {"message": "Book was deleted successfully!"},
             status=status.HTTP_204_NO_CONTENT,
         )
 
 
+def query_limit(request, default, maximum):
+    # ?limit= を 1〜maximum の範囲で読む（指定が無い・不正な場合は default）
+    try:
+        return min(max(int(request.GET["limit"]), 1), maximum)
+    except (KeyError, ValueError):
+        return default
+
+
+MAX_FACET_LIMIT = 1000
+
+
+@versioned(*versions.BOOK_TABLES)
+@cached_response(*versions.BOOK_TABLES)
+@api_view(["GET"])
+@renderer_classes(API_RENDERERS)
+def book_facets(request):
+    # カテゴリー・著者・出版年ごとの本の数（book_listと同じ ?title= で絞り込める）
+    # 結果はテーブルのバージョンが変わるまでキャッシュされる
+    books = None
+    title = request.GET.get("title", None)
+    if title is not None:
+        books = filter_contains(Book.objects.all(), "title", title, versions.BOOK)
+    limit = query_limit(request, FACET_LIMIT, MAX_FACET_LIMIT)
+    return Response(count_facets(books, limit))
+
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+@versioned(*versions.BOOK_TABLES)
+@cached_response(*versions.BOOK_TABLES)
+@api_view(["GET"])
+@renderer_classes(API_RENDERERS)
+@parser_classes(API_PARSERS)
+def book_search(request):
+    # タイトルの関連度順（完全一致・前方一致を優先）に上位の本を返す
+    fields = requested_book_fields(request.query_params)
+    query = request.GET.get("q", "").strip()
+    limit = query_limit(request, SEARCH_LIMIT, MAX_SEARCH_LIMIT)
+    if not query:
+        return Response({"results": []})
+    book_ids = ranked_ids(Book, "title", query, versions.BOOK, limit)
+    rows = {
+        row["id"]: row
+        for row in Book.objects.filter(id__in=book_ids).values(
+            *book_values_fields(fields)
+        )
+    }
+    books = serialize_book_rows(
+        [rows[book_id] for book_id in book_ids if book_id in rows], fields
+    )
+    return Response({"results": books})
+
+
+BULK_LIMIT = 1000
+# 1冊あたり数百バイトなので、上限の件数に対して十分な大きさにする
+BULK_MAX_BYTES = 4 * 1024 * 1024
+
+
+def parse_bulk_items(request):
+    # JSON配列とNDJSON（1行に1冊）のどちらでも受け付ける
+    # NDJSONは上限を超えたと分かった時点で読むのをやめる
+    if request.content_type == "application/x-ndjson":
+        items = []
+        for line in iter(request.readline, b""):
+            if line.strip():
+                items.append(json.loads(line))
+                if len(items) > BULK_LIMIT:
+                    break
+        return items
+    items = JSONParser().parse(request)
+    if not isinstance(items, list):
+        raise ValueError("Expected a list of books")
+    return items
+
+
+@api_view(["POST"])
+def book_bulk(request):
+    # 複数の本をまとめて登録・更新する（idがあれば更新、なければ新規登録）
+    try:
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > BULK_MAX_BYTES:
+        return JsonResponse(
+            {"message": f"Request body too large. The limit is {BULK_MAX_BYTES} bytes"},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+    try:
+        items = parse_bulk_items(request)
+    except (ValueError, ParseError) as e:
+        return JsonResponse({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > BULK_LIMIT:
+        return JsonResponse(
+            {"message": f"Too many books. The limit is {BULK_LIMIT}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # 1件でもエラーがあれば何も登録しない
+    books, errors = validate_book_items(items)
+    if errors:
+        return JsonResponse({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    creates = [book for book in books if book["id"] is None]
+    updates = [book for book in books if book["id"] is not None]
+    importer = BookImporter()
+    with transaction.atomic():
+        for book, created in zip(creates, importer.write(creates)):
+            book["id"] = created.pk
+        exist_books = Book.objects.in_bulk([book["id"] for book in updates])
+        importer.update([exist_books[book["id"]] for book in updates], updates)
+        versions.bump(*versions.BOOK_TABLES)
+
+    book_ids = [book["id"] for book in books]
+    rows = {
+        row["id"]: row
+        for row in serialize_book_rows(
+            Book.objects.filter(id__in=book_ids).values(*BOOK_FIELDS)
+        )
+    }
+    return JsonResponse(
+        {"results": [rows[book_id] for book_id in book_ids]},
+        status=status.HTTP_201_CREATED,
+    )
+
+
+@versioned(*versions.AUTHOR_TABLES)
+@cached_response(*versions.AUTHOR_TABLES)
 @api_view(["GET", "POST"])
+@renderer_classes(API_RENDERERS)
+@parser_classes(API_PARSERS)
 def author_list(request):
     # GET list of tutorials, POST a new tutorial, DELETE all tutorials
     if request.method == "GET":
@@ -379,52 +664,58 @@ def author_list(request):
 
         name = request.GET.get("name", None)
         if name is not None:
-            authors = authors.filter(name__icontains=name)
+            authors = filter_contains(authors, "name", name, versions.AUTHOR)
 
-        authors_serializer = AuthorSerializer(authors, many=True)
-        return JsonResponse(authors_serializer.data, safe=False)
-        # 'safe=False' for objects serialization
+        return paginated_response(request, authors, AuthorSerializer, KeysetPagination)
     elif request.method == "POST":
-        author_data = JSONParser().parse(request)
+        author_data = request.data
         author_serializer = AuthorSerializer(data=author_data)
         if author_serializer.is_valid():
             author_serializer.save()
-            return JsonResponse(author_serializer.data, status=status.HTTP_201_CREATED)
-        return JsonResponse(
+            return Response(author_serializer.data, status=status.HTTP_201_CREATED)
+        return Response(
             author_serializer.errors, status=status.HTTP_400_BAD_REQUEST
         )
 
 
+@versioned(*versions.AUTHOR_TABLES)
+@cached_response(*versions.AUTHOR_TABLES)
 @api_view(["GET", "PUT", "DELETE"])
+@renderer_classes(API_RENDERERS)
+@parser_classes(API_PARSERS)
 def author_detail(request, id):
     # find tutorial by pk (id)
     try:
         author = Author.objects.get(id=id)
     except Author.DoesNotExist:
-        return JsonResponse(
+        return Response(
             {"message": "The author does not exist"}, status=status.HTTP_404_NOT_FOUND
         )
     if request.method == "GET":
         author_serializer = AuthorSerializer(author)
-        return JsonResponse(author_serializer.data)
+        return Response(author_serializer.data)
     elif request.method == "PUT":
-        author_data = JSONParser().parse(request)
+        author_data = request.data
         author_serializer = AuthorSerializer(author, data=author_data)
         if author_serializer.is_valid():
             author_serializer.save()
-            return JsonResponse(author_serializer.data)
-        return JsonResponse(
+            return Response(author_serializer.data)
+        return Response(
             author_serializer.errors, status=status.HTTP_400_BAD_REQUEST
         )
     elif request.method == "DELETE":
         author.delete()
-        return JsonResponse(
+        return Response(
             {"message": "Author was deleted successfully!"},
             status=status.HTTP_204_NO_CONTENT,
         )
 
 
+@versioned(*versions.CATEGORY_TABLES)
+@cached_response(*versions.CATEGORY_TABLES)
 @api_view(["GET", "POST"])
+@renderer_classes(API_RENDERERS)
+@parser_classes(API_PARSERS)
 def category_list(request):
     # GET list of tutorials, POST a new tutorial, DELETE all tutorials
     if request.method == "GET":
@@ -432,48 +723,109 @@ def category_list(request):
 
         name = request.GET.get("name", None)
         if name is not None:
-            categories = categories.filter(name__icontains=name)
+            categories = filter_contains(categories, "name", name, versions.CATEGORY)
 
-        categories_serializer = CategorySerializer(categories, many=True)
-        return JsonResponse(categories_serializer.data, safe=False)
-        # 'safe=False' for objects serialization
+        return paginated_response(request, categories, CategorySerializer, KeysetPagination)
     elif request.method == "POST":
-        category_data = JSONParser().parse(request)
+        category_data = request.data
         category_serializer = CategorySerializer(data=category_data)
         if category_serializer.is_valid():
             category_serializer.save()
-            return JsonResponse(
+            return Response(
                 category_serializer.data, status=status.HTTP_201_CREATED
             )
-        return JsonResponse(
+        return Response(
             category_serializer.errors, status=status.HTTP_400_BAD_REQUEST
         )
 
 
+@versioned(*versions.CATEGORY_TABLES)
+@cached_response(*versions.CATEGORY_TABLES)
 @api_view(["GET", "PUT", "DELETE"])
+@renderer_classes(API_RENDERERS)
+@parser_classes(API_PARSERS)
 def category_detail(request, id):
     # find tutorial by pk (id)
     try:
         category = Category.objects.get(id=id)
     except Category.DoesNotExist:
-        return JsonResponse(
+        return Response(
             {"message": "The category does not exist"}, status=status.HTTP_404_NOT_FOUND
         )
     if request.method == "GET":
         category_serializer = CategorySerializer(category)
-        return JsonResponse(category_serializer.data)
+        return Response(category_serializer.data)
     elif request.method == "PUT":
-        category_data = JSONParser().parse(request)
+        category_data = request.data
         category_serializer = CategorySerializer(category, data=category_data)
         if category_serializer.is_valid():
             category_serializer.save()
-            return JsonResponse(category_serializer.data)
-        return JsonResponse(
+            return Response(category_serializer.data)
+        return Response(
             category_serializer.errors, status=status.HTTP_400_BAD_REQUEST
         )
     elif request.method == "DELETE":
         category.delete()
-        return JsonResponse(
+        return Response(
             {"message": "Category was deleted successfully!"},
             status=status.HTTP_204_NO_CONTENT,
         )
+
+
+AUTOCOMPLETE_LIMIT = 20
+MAX_AUTOCOMPLETE_LIMIT = 100
+
+
+def autocomplete_response(request, model, version_name):
+    # フォームの著者・カテゴリー選択用：名前の前方一致を優先して候補を返す
+    limit = query_limit(request, AUTOCOMPLETE_LIMIT, MAX_AUTOCOMPLETE_LIMIT)
+    ids = autocomplete_ids(model, "name", request.GET.get("q", ""), version_name, limit)
+    names = dict(model.objects.filter(pk__in=ids).values_list("pk", "name"))
+    return Response(
+        {"results": [{"id": pk, "name": names[pk]} for pk in ids if pk in names]}
+    )
+
+
+@versioned(*versions.AUTHOR_TABLES)
+@cached_response(*versions.AUTHOR_TABLES)
+@api_view(["GET"])
+@renderer_classes(API_RENDERERS)
+def author_autocomplete(request):
+    return autocomplete_response(request, Author, versions.AUTHOR)
+
+
+@versioned(*versions.CATEGORY_TABLES)
+@cached_response(*versions.CATEGORY_TABLES)
+@api_view(["GET"])
+@renderer_classes(API_RENDERERS)
+def category_autocomplete(request):
+    return autocomplete_response(request, Category, versions.CATEGORY)
+
+
+@api_view(["POST"])
+def import_job_list(request):
+    csv_file = request.FILES.get("csv")
+    if csv_file is None or not csv_file.name.endswith(".csv"):
+        return JsonResponse(
+            {"message": "Wrong File Format"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    job = ImportJob.objects.create(csv_file=csv_file)
+    enqueue(job)
+    return JsonResponse(job_status(job), status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["GET"])
+def import_job_detail(request, id):
+    try:
+        job = ImportJob.objects.get(id=id)
+    except ImportJob.DoesNotExist:
+        return JsonResponse(
+            {"message": "The import job does not exist"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    return JsonResponse(job_status(job))
+
+
+@api_view(["GET"])
+def api_cache_stats(request):
+    return JsonResponse(cache_stats())
@@ -90,6 +90,23 @@ DATABASES = {
 }
 
 
+# Cache
+# 本番ではプロセス間で共有できるバックエンド（Memcached等）を環境変数で指定する
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+
+# APIのレスポンスキャッシュに使うキャッシュ
+BOOK_API_CACHE = "default"
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -128,6 +145,24 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 
+# アップロードされたファイル（バックグラウンドインポート用CSVなど）
+
+MEDIA_ROOT = BASE_DIR / "media"
+
+MEDIA_URL = "/media/"
+
+# 書籍一覧CSVの出力ファイルの保存先
+BOOK_EXPORT_DIR = MEDIA_ROOT / "exports"
+
+# CSVインポートジョブを処理するスレッド数
+BOOK_IMPORT_WORKERS = int(os.environ.get("BOOK_IMPORT_WORKERS", 2))
+
+REST_FRAMEWORK = {
+    "DEFAULT_PAGINATION_CLASS": "book.pagination.KeysetPagination",
+    # 一覧APIの1ページあたりの件数（?page_size= で最大1000件まで変更可能）
+    "PAGE_SIZE": 100,
+}
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -4,3 +4,30 @@ import pytest
 @pytest.fixture(autouse=True)
 def enable_db_access_for_all_tests(db):
     pass
+
+
+@pytest.fixture(autouse=True)
+def skip_unless_postgresql(request):
+    # @pytest.mark.postgresql の付いたテストはPostgreSQLでだけ実行する
+    from django.db import connection
+    if request.node.get_closest_marker("postgresql") and connection.vendor != "postgresql":
+        pytest.skip("requires PostgreSQL")
+
+
+@pytest.fixture(autouse=True)
+def use_tmp_media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.BOOK_EXPORT_DIR = tmp_path / "exports"
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_search_indexes():
+    # テストごとにDBが戻るので、バージョンが同じでも中身の違う索引を使わないようにする
+    from book.search import clear_indexes
+    clear_indexes()